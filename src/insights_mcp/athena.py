@@ -4,15 +4,57 @@ Athena client for executing queries against the data warehouse.
 Uses AWS SSO credentials from the default profile.
 """
 
+import csv
+import importlib.util
+import io
+import random
 import re
+import threading
 import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from concurrent.futures import TimeoutError as FuturesTimeoutError
 from dataclasses import dataclass
-from typing import Any
+from functools import lru_cache
+from itertools import islice
+from typing import Any, Iterator
 
 import boto3
+from botocore.config import Config
+from botocore.exceptions import ClientError
+
+
+@lru_cache(maxsize=1)
+def _session() -> boto3.session.Session:
+    """One boto3 session for the process, so credentials (SSO) are resolved once."""
+    return boto3.session.Session()
+
+
+# boto3 sessions are not thread-safe for client creation (clients themselves are).
+_client_lock = threading.Lock()
+
+
+@lru_cache(maxsize=None)
+def _make_client(service: str, region: str):
+    """
+    Return a process-wide boto3 client per (service, region).
+
+    Creating a client loads service models, resolves credentials and opens a new
+    connection pool, so every `AthenaClient` for a region shares one (clients are
+    thread-safe). The pool is sized for the hedge/prefetch worker threads.
+    """
+    with _client_lock:
+        return _session().client(
+            service,
+            region_name=region,
+            config=Config(
+                max_pool_connections=32,
+                connect_timeout=5,
+                retries={"mode": "adaptive", "max_attempts": 10},
+            ),
+        )
 
 
-@dataclass
+@dataclass(slots=True)
 class QueryResult:
     """Result of an Athena query."""
     columns: list[str]
@@ -31,34 +73,150 @@ class AthenaClient:
         database: str = "d11_stitch",
         region: str = "ap-south-1",
         output_location: str | None = None,
-        max_results: int = 100,
+        page_size: int = 1000,
+        max_results: int | None = None,
         poll_interval: float = 1.0,
+        initial_poll_interval: float = 0.05,
         timeout: float = 300.0,
+        hedge_requests: bool = True,
+        retry_wait_time: float = 60.0,
+        fetch_mode: str = "api",
     ):
         self.workgroup = workgroup
         self.database = database
         self.region = region
         self.output_location = output_location or f"s3://aws-athena-query-results-944380855954-{region}/"
-        # Athena API pagination page size. This is NOT a hard cap on total rows
-        # returned unless we enforce it in `_fetch_results`.
-        self.max_results = max_results
+        # Athena API pagination page size (`max_results` is the older name for it).
+        # This is NOT a cap on total rows returned; that is `max_rows` per query.
+        self.page_size = page_size if max_results is None else max_results
+        # Polling starts at `initial_poll_interval` and backs off geometrically up to
+        # `poll_interval`, so short queries return quickly without over-polling long ones.
         self.poll_interval = poll_interval
+        self.initial_poll_interval = min(initial_poll_interval, poll_interval)
         self.timeout = timeout
-        self._client = boto3.client("athena", region_name=region)
-
-    _NON_WRAPPABLE_PREFIX = re.compile(
-        r"^\s*(SHOW|DESCRIBE|EXPLAIN|MSCK|USE|SET|CREATE|DROP|ALTER|INSERT|UPDATE|DELETE)\b",
-        re.IGNORECASE,
+        # Re-issue a `get_query_results` page request that takes longer than
+        # `_HEDGE_LATENCY_FACTOR` x the moving-average page latency, and keep
+        # whichever copy answers first (the call is a read, so duplicates are safe).
+        self.hedge_requests = hedge_requests
+        self._page_latency_ema: float | None = None
+        # Worker pools are created lazily: "hedge" runs duplicate page requests and
+        # "prefetch" fetches page N+1 while page N is being consumed.
+        self._executors: dict[str, ThreadPoolExecutor] = {}
+        self._executor_lock = threading.Lock()
+        # Table metadata rarely changes within a session; cache it per (database, table).
+        self._schema_cache: dict[tuple[str, str], list[dict[str, Any]]] = {}
+        self._ddl_cache: dict[tuple[str, str], str] = {}
+        # API throttling is retried by botocore; queries that *fail* for a transient
+        # reason (S3 SlowDown, throttling) are resubmitted for up to `retry_wait_time`.
+        self.retry_wait_time = retry_wait_time
+        # "api" pages through GetQueryResults; "s3" downloads the result CSV Athena
+        # already wrote to the output location and parses it with pyarrow; "auto"
+        # picks "s3" when pyarrow is installed.
+        if fetch_mode not in ("api", "s3", "auto"):
+            raise ValueError(f"fetch_mode must be 'api', 's3' or 'auto', got {fetch_mode!r}")
+        if fetch_mode == "auto":
+            fetch_mode = "s3" if importlib.util.find_spec("pyarrow") else "api"
+        self.fetch_mode = fetch_mode
+        self._client = _make_client("athena", region)
+
+    def warm_up(self) -> None:
+        """
+        Create the clients a query will need (and open the Athena connection) ahead
+        of the first call, so it doesn't pay for service-model loading or TLS setup.
+        """
+        self._client.list_work_groups(MaxResults=1)
+        if self.fetch_mode == "s3":
+            _make_client("s3", self.region)
+
+    @property
+    def max_results(self) -> int:
+        """Backwards-compatible alias for `page_size`."""
+        return self.page_size
+
+    @max_results.setter
+    def max_results(self, value: int) -> None:
+        self.page_size = value
+
+    # GetQueryResults rejects MaxResults above 1000.
+    MAX_PAGE_SIZE = 1000
+    # BatchGetQueryExecution accepts at most 50 ids per call.
+    _BATCH_GET_LIMIT = 50
+    # A query still QUEUED after this many seconds is waiting on workgroup capacity;
+    # poll it no faster than `_QUEUED_POLL_INTERVAL` to stay clear of API throttling.
+    _QUEUED_SLOW_AFTER = 5.0
+    _QUEUED_POLL_INTERVAL = 2.0
+    # Ranged GET size used to read capped (`max_rows`) results in fetch_mode="s3".
+    _S3_PREVIEW_RANGE_BYTES = 64 * 1024
+
+    _TRANSIENT_FAILURE = re.compile(
+        r"SlowDown|Throttl|Rate exceeded|TooManyRequests|exhausted resources", re.IGNORECASE
+    )
+    # Resubmission backoff: doubles from 1s up to this cap, plus up to 50% random jitter
+    # so concurrent callers that failed together don't all resubmit at the same moment.
+    _RETRY_MAX_DELAY = 8.0
+
+    _HEDGE_LATENCY_FACTOR = 2.0
+    _HEDGE_MIN_DELAY = 0.2
+    _LATENCY_EMA_ALPHA = 0.2
+
+    _NON_WRAPPABLE = frozenset({
+        "SHOW", "DESCRIBE", "EXPLAIN", "MSCK", "USE", "SET",
+        "CREATE", "DROP", "ALTER", "INSERT", "UPDATE", "DELETE",
+    })
+    _FIRST_WORD = re.compile(r"\w+")
+    # Statements that only read data, so their results may be cached and shared.
+    _READ_ONLY = frozenset({"SELECT", "WITH", "SHOW", "DESCRIBE", "VALUES"})
+    _LEADING_COMMENTS = re.compile(r"(?:\s+|--[^\n]*|/\*.*?\*/)*", re.DOTALL)
+    _TRAILING_LIMIT = re.compile(r"\bLIMIT\s+(\d+)\s*$", re.IGNORECASE)
+    # Quoted literals/identifiers and comments (kept verbatim), whitespace runs that
+    # span a line break, and horizontal whitespace runs.
+    _SQL_WHITESPACE = re.compile(
+        r"""('(?:[^']|'')*'|"(?:[^"]|"")*"|--[^\n]*|/\*.*?\*/)|(\s*\n\s*)|([ \t\r\f\v]+)""",
+        re.DOTALL,
     )
 
     @staticmethod
     def _strip_trailing_semicolon(query: str) -> str:
         return query.strip().rstrip(";").strip()
 
+    @classmethod
+    def normalize_query(cls, query: str) -> str:
+        """
+        Canonicalize layout so re-indented copies of a query share Athena's result-reuse
+        cache (and callers' own caches): collapse blank lines/indentation to one newline
+        and other runs to one space.
+        Line breaks are kept (a `--` comment must still end), as are quoted text and comments.
+        """
+
+        def replace(m: re.Match[str]) -> str:
+            if m.group(1):
+                return m.group(1)
+            return "\n" if m.group(2) else " "
+
+        return cls._SQL_WHITESPACE.sub(replace, cls._strip_trailing_semicolon(query))
+
+    @classmethod
+    def is_read_only(cls, query: str) -> bool:
+        """
+        True if the statement's leading keyword (after any comments) is one that only reads
+        data. Anything else, including statements it can't classify, counts as a write.
+        """
+        q = cls.normalize_query(query)
+        first = cls._FIRST_WORD.match(q, cls._LEADING_COMMENTS.match(q).end())
+        return bool(first) and first.group().upper() in cls._READ_ONLY
+
     def _maybe_wrap_with_limit(self, query: str, limit: int) -> str:
         q = self._strip_trailing_semicolon(query)
-        if self._NON_WRAPPABLE_PREFIX.search(q):
+        # Only the leading keyword matters; never scan or case-fold the whole query.
+        first = self._FIRST_WORD.match(q[:16])
+        if first and first.group().upper() in self._NON_WRAPPABLE:
             return q
+        # An outer LIMIT that is already tight enough keeps Athena's own limit pushdown.
+        trailing = self._TRAILING_LIMIT.search(q)
+        if trailing and int(trailing.group(1)) <= limit:
+            line_start = q.rfind("\n", 0, trailing.start()) + 1
+            if "--" not in q[line_start:trailing.start()]:
+                return q
         # Wrap to enforce an upper bound on result rows.
         return f"SELECT * FROM (\n{q}\n) AS _q\nLIMIT {int(limit)}"
 
@@ -68,6 +226,7 @@ class AthenaClient:
         *,
         max_rows: int | None = None,
         enforce_limit: bool = False,
+        result_reuse_minutes: int | None = None,
     ) -> QueryResult:
         """
         Execute a query and wait for results.
@@ -77,6 +236,8 @@ class AthenaClient:
             max_rows: Maximum number of rows to fetch from Athena results (client-side cap).
             enforce_limit: If True and max_rows is set, wrap the query with a LIMIT to
                 enforce a server-side cap where possible.
+            result_reuse_minutes: If set, let Athena answer from a previous identical
+                query's results that are at most this many minutes old (no data scanned).
 
         Returns:
             QueryResult with columns, rows, and metadata
@@ -85,9 +246,118 @@ class AthenaClient:
             TimeoutError: If query exceeds timeout
             RuntimeError: If query fails
         """
+        execution = self._run_to_completion(
+            query,
+            max_rows=max_rows,
+            enforce_limit=enforce_limit,
+            result_reuse_minutes=result_reuse_minutes,
+        )
+        return self._fetch_results(execution, max_rows=max_rows)
+
+    def execute_query_iter(
+        self,
+        query: str,
+        *,
+        max_rows: int | None = None,
+        enforce_limit: bool = False,
+        result_reuse_minutes: int | None = None,
+    ) -> Iterator[dict[str, Any]]:
+        """
+        Execute a query and lazily yield result rows as dicts, one page at a time.
+
+        Same arguments and errors as `execute_query`; the query runs to completion
+        before the first row is yielded, but only one result page is held in memory.
+        """
+        execution = self._run_to_completion(
+            query,
+            max_rows=max_rows,
+            enforce_limit=enforce_limit,
+            result_reuse_minutes=result_reuse_minutes,
+        )
+        return self._iter_rows(execution["QueryExecutionId"], max_rows=max_rows, execution=execution)
+
+    def execute_queries(
+        self,
+        queries: list[str],
+        *,
+        max_rows: int | None = None,
+        enforce_limit: bool = False,
+        result_reuse_minutes: int | None = None,
+    ) -> list[QueryResult | Exception]:
+        """
+        Execute several queries concurrently.
+
+        All queries are started up front and polled together through
+        `BatchGetQueryExecution`, so wall time tracks the slowest query rather than
+        the sum. Returns one entry per query, in order: its QueryResult, or the
+        exception it failed with (same errors as `execute_query`).
+        """
+        outcomes: list[QueryResult | Exception | None] = [None] * len(queries)
+        pending: dict[str, int] = {}
+        for i, query in enumerate(queries):
+            try:
+                query_execution_id = self.start_query(
+                    query,
+                    max_rows=max_rows,
+                    enforce_limit=enforce_limit,
+                    result_reuse_minutes=result_reuse_minutes,
+                )
+                pending[query_execution_id] = i
+            except Exception as e:
+                outcomes[i] = e
+
+        retry_deadline = time.monotonic() + self.retry_wait_time
+        retry_delay = 1.0
+        while pending:
+            to_resubmit: list[int] = []
+            for query_execution_id, execution in self._wait_for_many(list(pending)).items():
+                i = pending.pop(query_execution_id)
+                if isinstance(execution, Exception):
+                    outcomes[i] = execution
+                    continue
+                status = execution["Status"]
+                if status["State"] == "SUCCEEDED":
+                    try:
+                        outcomes[i] = self._fetch_results(execution, max_rows=max_rows)
+                    except Exception as e:
+                        outcomes[i] = e
+                elif self._is_transient_failure(status) and time.monotonic() < retry_deadline:
+                    to_resubmit.append(i)
+                else:
+                    reason = status.get("StateChangeReason", "Unknown error")
+                    outcomes[i] = RuntimeError(f"Query failed: {reason}")
+
+            if to_resubmit:
+                retry_delay = self._backoff_sleep(retry_delay, retry_deadline)
+                for i in to_resubmit:
+                    try:
+                        query_execution_id = self.start_query(
+                            queries[i],
+                            max_rows=max_rows,
+                            enforce_limit=enforce_limit,
+                            result_reuse_minutes=result_reuse_minutes,
+                        )
+                        pending[query_execution_id] = i
+                    except Exception as e:
+                        outcomes[i] = e
+
+        return outcomes  # type: ignore[return-value]
+
+    def start_query(
+        self,
+        query: str,
+        *,
+        max_rows: int | None = None,
+        enforce_limit: bool = False,
+        result_reuse_minutes: int | None = None,
+    ) -> str:
+        """Start a query without waiting for it and return its execution id."""
         query_to_run = query
+        if result_reuse_minutes:
+            # Reuse only matches identical query strings.
+            query_to_run = self.normalize_query(query_to_run)
         if enforce_limit and max_rows is not None:
-            query_to_run = self._maybe_wrap_with_limit(query, max_rows)
+            query_to_run = self._maybe_wrap_with_limit(query_to_run, max_rows)
 
         # Start query execution
         execution_params = {
@@ -101,123 +371,479 @@ class AthenaClient:
             execution_params["ResultConfiguration"] = {
                 "OutputLocation": self.output_location
             }
+
+        if result_reuse_minutes:
+            execution_params["ResultReuseConfiguration"] = {
+                "ResultReuseByAgeConfiguration": {
+                    "Enabled": True,
+                    "MaxAgeInMinutes": int(result_reuse_minutes),
+                }
+            }
         
         response = self._client.start_query_execution(**execution_params)
-        query_execution_id = response["QueryExecutionId"]
+        return response["QueryExecutionId"]
 
-        # Wait for completion
-        state = self._wait_for_completion(query_execution_id)
-
-        if state != "SUCCEEDED":
-            execution = self._client.get_query_execution(
-                QueryExecutionId=query_execution_id
-            )
-            reason = execution["QueryExecution"]["Status"].get(
-                "StateChangeReason", "Unknown error"
+    def _run_to_completion(
+        self,
+        query: str,
+        *,
+        max_rows: int | None = None,
+        enforce_limit: bool = False,
+        result_reuse_minutes: int | None = None,
+    ) -> dict[str, Any]:
+        """Start a query, wait for it to succeed and return its final `QueryExecution`."""
+        retry_deadline = time.monotonic() + self.retry_wait_time
+        retry_delay = 1.0
+        while True:
+            query_execution_id = self.start_query(
+                query,
+                max_rows=max_rows,
+                enforce_limit=enforce_limit,
+                result_reuse_minutes=result_reuse_minutes,
             )
-            raise RuntimeError(f"Query failed: {reason}")
-
-        # Fetch results
-        return self._fetch_results(query_execution_id, max_rows=max_rows)
 
-    def _wait_for_completion(self, query_execution_id: str) -> str:
-        """Poll until query completes or times out."""
-        start_time = time.time()
+            # Wait for completion
+            execution = self._wait_for_completion(query_execution_id)
+            status = execution["Status"]
+            if status["State"] == "SUCCEEDED":
+                return execution
+
+            reason = status.get("StateChangeReason", "Unknown error")
+            remaining = retry_deadline - time.monotonic()
+            if not self._is_transient_failure(status) or remaining <= 0:
+                raise RuntimeError(f"Query failed: {reason}")
+            retry_delay = self._backoff_sleep(retry_delay, retry_deadline)
+
+    def _backoff_sleep(self, delay: float, deadline: float) -> float:
+        """Sleep `delay` plus jitter (never past `deadline`) and return the next delay."""
+        jittered = delay + random.uniform(0, delay / 2)
+        time.sleep(min(jittered, max(0.0, deadline - time.monotonic())))
+        return min(delay * 2, self._RETRY_MAX_DELAY)
+
+    @classmethod
+    def _is_transient_failure(cls, status: dict[str, Any]) -> bool:
+        """True when a FAILED query is worth resubmitting (throttling, S3 SlowDown, load)."""
+        if status.get("State") != "FAILED":
+            return False
+        if status.get("AthenaError", {}).get("Retryable"):
+            return True
+        return bool(cls._TRANSIENT_FAILURE.search(status.get("StateChangeReason") or ""))
+
+    def _wait_for_completion(self, query_execution_id: str) -> dict[str, Any]:
+        """Poll with exponential backoff until query completes or times out; return its `QueryExecution`."""
+        started = time.monotonic()
+        deadline = started + self.timeout
+        delay = self.initial_poll_interval
 
         while True:
-            if time.time() - start_time > self.timeout:
+            response = self._client.get_query_execution(
+                QueryExecutionId=query_execution_id
+            )
+            execution = response["QueryExecution"]
+            state = execution["Status"]["State"]
+            if state in ("SUCCEEDED", "FAILED", "CANCELLED"):
+                return execution
+            if state == "QUEUED" and time.monotonic() - started > self._QUEUED_SLOW_AFTER:
+                delay = max(delay, self._QUEUED_POLL_INTERVAL)
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
                 raise TimeoutError(
                     f"Query {query_execution_id} timed out after {self.timeout}s"
                 )
 
-            response = self._client.get_query_execution(
-                QueryExecutionId=query_execution_id
-            )
-            state = response["QueryExecution"]["Status"]["State"]
+            time.sleep(min(delay, remaining))
+            delay = min(delay * 1.5, self.poll_interval)
 
-            if state in ("SUCCEEDED", "FAILED", "CANCELLED"):
-                return state
+    def _get_executor(self, name: str) -> ThreadPoolExecutor:
+        with self._executor_lock:
+            executor = self._executors.get(name)
+            if executor is None:
+                executor = ThreadPoolExecutor(
+                    max_workers=4, thread_name_prefix=f"athena-{name}"
+                )
+                self._executors[name] = executor
+            return executor
 
-            time.sleep(self.poll_interval)
+    def _record_page_latency(self, elapsed: float) -> None:
+        if self._page_latency_ema is None:
+            self._page_latency_ema = elapsed
+        else:
+            alpha = self._LATENCY_EMA_ALPHA
+            self._page_latency_ema = alpha * elapsed + (1 - alpha) * self._page_latency_ema
 
-    def _fetch_results(self, query_execution_id: str, max_rows: int | None = None) -> QueryResult:
-        """Fetch query results with pagination, optionally capping total rows returned."""
-        columns: list[str] = []
-        rows: list[dict[str, Any]] = []
-        next_token: str | None = None
-        is_first_page = True
+    def _get_results_page(self, **kwargs: Any) -> dict[str, Any]:
+        """
+        Call `get_query_results`, hedging against straggling pages.
 
-        while True:
-            if max_rows is not None and len(rows) >= max_rows:
-                break
+        Until a latency baseline exists (or when hedging is disabled) this is a plain call.
+        Afterwards, if the request has not answered within the hedge threshold, an identical
+        duplicate is issued and the first successful response wins.
+        """
+        started = time.monotonic()
+        if not self.hedge_requests or self._page_latency_ema is None:
+            response = self._client.get_query_results(**kwargs)
+            self._record_page_latency(time.monotonic() - started)
+            return response
+
+        hedge_after = max(self._HEDGE_MIN_DELAY, self._HEDGE_LATENCY_FACTOR * self._page_latency_ema)
+        executor = self._get_executor("hedge")
+        primary = executor.submit(self._client.get_query_results, **kwargs)
+        try:
+            response = primary.result(timeout=hedge_after)
+        except FuturesTimeoutError:
+            pending = {primary, executor.submit(self._client.get_query_results, **kwargs)}
+            response = None
+            error: BaseException | None = None
+            while pending and response is None:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    if future.exception() is None:
+                        response = future.result()
+                        break
+                    error = future.exception()
+            # The losing request cannot be aborted once in flight; just drop its result.
+            for future in pending:
+                future.cancel()
+            if response is None:
+                raise error  # type: ignore[misc]
+
+        self._record_page_latency(time.monotonic() - started)
+        return response
+
+    def _iter_result_pages(
+        self,
+        query_execution_id: str,
+        max_rows: int | None = None,
+        execution: dict[str, Any] | None = None,
+    ) -> Iterator[tuple[list[str], list[dict[str, Any]]]]:
+        """
+        Yield `(columns, rows)` per result page, stopping once `max_rows` rows were produced.
+        `execution` is the finished `QueryExecution`, when the caller already has it.
+        """
+        if self.fetch_mode == "s3":
+            if execution is None:
+                execution = self._client.get_query_execution(
+                    QueryExecutionId=query_execution_id
+                )["QueryExecution"]
+            location = execution.get("ResultConfiguration", {}).get("OutputLocation", "")
+            # DDL/utility statements (SHOW, DESCRIBE, ...) write .txt output, not CSV.
+            if location.endswith(".csv"):
+                return self._iter_s3_csv_pages(location, max_rows=max_rows)
+        return self._iter_api_result_pages(query_execution_id, max_rows=max_rows)
+
+    def _iter_s3_csv_pages(
+        self, location: str, max_rows: int | None = None
+    ) -> Iterator[tuple[list[str], list[dict[str, Any]]]]:
+        """Parse an Athena result CSV from S3 with pyarrow and yield it page by page."""
+        try:
+            import pyarrow as pa
+            from pyarrow import csv as pa_csv
+        except ImportError as e:
+            raise ImportError(
+                "fetch_mode='s3' requires pyarrow (install insights-mcp[arrow])"
+            ) from e
+
+        bucket, _, key = location.removeprefix("s3://").partition("/")
+        s3 = _make_client("s3", self.region)
+        buf = self._read_s3_csv_prefix(s3, bucket, key, max_rows) if max_rows is not None else None
+        if buf is None:
+            buf = io.BytesIO()
+            s3.download_fileobj(bucket, key, buf)
+            buf.seek(0)
+        if not buf.getbuffer().nbytes:
+            # DDL/DML can leave a zero-byte result object, which pyarrow rejects as
+            # having no columns; the API path returns an empty result here.
+            yield [], []
+            return
+        header = next(csv.reader([buf.readline().decode("utf-8")]), [])
+        buf.seek(0)
+
+        # Athena quotes every value and writes NULL as an unquoted empty field. Read
+        # everything as strings so values match what GetQueryResults returns. The whole
+        # (already downloaded) object is parsed at once by pyarrow's multithreaded reader.
+        # Quoted values may contain newlines; without `newlines_in_values` pyarrow splits
+        # blocks (~1 MB) at any newline, which can land inside such a value.
+        table = pa_csv.read_csv(
+            buf,
+            read_options=pa_csv.ReadOptions(use_threads=True),
+            parse_options=pa_csv.ParseOptions(newlines_in_values=True),
+            convert_options=pa_csv.ConvertOptions(
+                column_types={name: pa.string() for name in header},
+                strings_can_be_null=True,
+                quoted_strings_can_be_null=False,
+            ),
+        )
+        if max_rows is not None:
+            table = table.slice(0, max_rows)
+        columns = list(table.column_names)
+        if table.num_rows == 0:
+            yield columns, []
+            return
+        # Rows become Python objects only here, one page at a time.
+        for batch in table.to_batches(max_chunksize=max(1, int(self.page_size))):
+            yield columns, batch.to_pylist()
+
+    def _read_s3_csv_prefix(self, s3: Any, bucket: str, key: str, max_rows: int) -> io.BytesIO | None:
+        """
+        Fetch only the header and first `max_rows` records of a result CSV with a ranged GET.
+        Returns None if the range doesn't hold all of them; the caller then downloads the object.
+        """
+        try:
+            response = s3.get_object(
+                Bucket=bucket, Key=key, Range=f"bytes=0-{self._S3_PREVIEW_RANGE_BYTES - 1}"
+            )
+            data = response["Body"].read()
+        except ClientError:
+            return None
+        if len(data) < self._S3_PREVIEW_RANGE_BYTES:
+            return io.BytesIO(data)  # the whole object fit in the range
+
+        # Quoted values may contain newlines, so find the record boundary with the csv
+        # module, tracking which physical lines it consumed.
+        text = data.decode("utf-8", errors="replace")
+        consumed: list[str] = []
+
+        def lines() -> Iterator[str]:
+            for line in io.StringIO(text, newline=""):
+                consumed.append(line)
+                yield line
+
+        reader = csv.reader(lines())
+        try:
+            records = sum(1 for _ in islice(reader, max_rows + 1))
+            prefix = "".join(consumed)
+            # A following record must have started, or the last one may be cut off.
+            if records < max_rows + 1 or next(reader, None) is None:
+                return None
+        except csv.Error:
+            return None
+        return io.BytesIO(prefix.encode("utf-8"))
+
+    def _iter_api_result_pages(
+        self, query_execution_id: str, max_rows: int | None = None
+    ) -> Iterator[tuple[list[str], list[dict[str, Any]]]]:
+        columns: list[str] = []
+        produced = 0
 
+        def page_kwargs(next_token: str | None, first_page: bool) -> dict[str, Any]:
             kwargs: dict[str, Any] = {
                 "QueryExecutionId": query_execution_id,
-                "MaxResults": self.max_results,
+                "MaxResults": min(self.MAX_PAGE_SIZE, int(self.page_size)),
             }
             if next_token:
                 kwargs["NextToken"] = next_token
-
             if max_rows is not None:
-                remaining = max_rows - len(rows)
-                # First page includes a header row, so request one extra row.
-                page_cap = remaining + (1 if is_first_page else 0)
-                kwargs["MaxResults"] = max(1, min(int(self.max_results), int(page_cap)))
-
-            response = self._client.get_query_results(**kwargs)
-            result_set = response["ResultSet"]
+                # Never request more rows than still needed; the first page carries a header row.
+                needed = max_rows - produced + (1 if first_page else 0)
+                kwargs["MaxResults"] = max(1, min(kwargs["MaxResults"], needed))
+            return kwargs
+
+        page = self._get_results_page(**page_kwargs(None, first_page=True))
+        page_number = 0
+        prefetch: Future | None = None
+        try:
+            while True:
+                result_set = page["ResultSet"]
+                data_rows = result_set["Rows"]
 
-            # Extract column names from first page
-            if is_first_page:
-                columns = [
-                    col["Label"] or col["Name"]
-                    for col in result_set["ResultSetMetadata"]["ColumnInfo"]
+                # Extract column names (and skip the header row) from the first page
+                if page_number == 0:
+                    columns = [
+                        col["Label"] or col["Name"]
+                        for col in result_set["ResultSetMetadata"]["ColumnInfo"]
+                    ]
+                    data_rows = data_rows[1:]
+                    col_names = tuple(columns)
+
+                if max_rows is not None:
+                    data_rows = data_rows[: max_rows - produced]
+                produced += len(data_rows)
+
+                # Double-buffer: request the next page before converting this one.
+                next_token = page.get("NextToken")
+                if next_token and (max_rows is None or produced < max_rows):
+                    prefetch = self._get_executor("prefetch").submit(
+                        self._get_results_page, **page_kwargs(next_token, first_page=False)
+                    )
+
+                # Convert rows to dicts
+                page_rows = [
+                    dict(zip(col_names, [cell.get("VarCharValue") for cell in row.get("Data", ())]))
+                    for row in data_rows
                 ]
-                # Skip header row on first page
-                data_rows = result_set["Rows"][1:]
-                is_first_page = False
-            else:
-                data_rows = result_set["Rows"]
+                yield columns, page_rows
 
-            # Convert rows to dicts
-            for row in data_rows:
-                row_data = {}
-                for i, cell in enumerate(row.get("Data", [])):
-                    value = cell.get("VarCharValue")
-                    row_data[columns[i]] = value
-                rows.append(row_data)
-                if max_rows is not None and len(rows) >= max_rows:
+                if prefetch is None:
                     break
+                page = prefetch.result()
+                prefetch = None
+                page_number += 1
+        finally:
+            # Consumer stopped early: drop the in-flight prefetch.
+            if prefetch is not None:
+                prefetch.cancel()
+
+    def iter_results(
+        self, query_execution_id: str, max_rows: int | None = None
+    ) -> Iterator[dict[str, Any]]:
+        """Lazily yield result rows of a finished query, holding one page in memory."""
+        return self._iter_rows(query_execution_id, max_rows=max_rows)
+
+    def _iter_rows(
+        self,
+        query_execution_id: str,
+        max_rows: int | None = None,
+        execution: dict[str, Any] | None = None,
+    ) -> Iterator[dict[str, Any]]:
+        for _, page_rows in self._iter_result_pages(
+            query_execution_id, max_rows=max_rows, execution=execution
+        ):
+            yield from page_rows
+
+    def _wait_for_many(self, query_execution_ids: list[str]) -> dict[str, dict[str, Any] | Exception]:
+        """
+        Poll several queries with one `BatchGetQueryExecution` per 50 ids until each
+        finishes or times out. Maps each id to its final `QueryExecution` or a TimeoutError.
+        """
+        deadline = time.monotonic() + self.timeout
+        delay = self.initial_poll_interval
+        finished: dict[str, dict[str, Any] | Exception] = {}
+        waiting = list(query_execution_ids)
+
+        while waiting:
+            for start in range(0, len(waiting), self._BATCH_GET_LIMIT):
+                response = self._client.batch_get_query_execution(
+                    QueryExecutionIds=waiting[start:start + self._BATCH_GET_LIMIT]
+                )
+                # Unprocessed ids are simply polled again on the next round.
+                for execution in response.get("QueryExecutions", []):
+                    if execution["Status"]["State"] in ("SUCCEEDED", "FAILED", "CANCELLED"):
+                        finished[execution["QueryExecutionId"]] = execution
+            waiting = [qid for qid in waiting if qid not in finished]
+            if not waiting:
+                break
 
-            next_token = response.get("NextToken")
-            if not next_token or (max_rows is not None and len(rows) >= max_rows):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                for qid in waiting:
+                    finished[qid] = TimeoutError(f"Query {qid} timed out after {self.timeout}s")
                 break
 
-        # Get execution statistics
-        execution = self._client.get_query_execution(
-            QueryExecutionId=query_execution_id
-        )
-        statistics = execution["QueryExecution"].get("Statistics")
+            time.sleep(min(delay, remaining))
+            delay = min(delay * 1.5, self.poll_interval)
+
+        return finished
+
+    def _fetch_results(self, execution: dict[str, Any], max_rows: int | None = None) -> QueryResult:
+        """Fetch query results with pagination, optionally capping total rows returned."""
+        query_execution_id = execution["QueryExecutionId"]
+        columns: list[str] = []
+        rows: list[dict[str, Any]] = []
+        for columns, page_rows in self._iter_result_pages(
+            query_execution_id, max_rows=max_rows, execution=execution
+        ):
+            rows.extend(page_rows)
 
         return QueryResult(
             columns=columns,
             rows=rows,
             query_execution_id=query_execution_id,
             state="SUCCEEDED",
-            statistics=statistics,
+            # The final poll already carries the execution statistics; no extra call needed.
+            statistics=execution.get("Statistics"),
         )
 
     def list_tables(self, database: str | None = None) -> list[str]:
         """List all tables in the database."""
         db = database or self.database
-        result = self.execute_query(f"SHOW TABLES IN {db}")
-        return [row.get("tab_name", "") for row in result.rows]
+        return [row.get("tab_name", "") for row in self.execute_query_iter(f"SHOW TABLES IN {db}")]
+
+    @staticmethod
+    def _cache_key(database: str, table: str) -> tuple[str, str]:
+        return database.strip().lower(), table.strip().lower()
 
     def describe_table(self, table: str, database: str | None = None) -> list[dict]:
-        """Get schema information for a table."""
+        """Get schema information for a table (cached per session)."""
         db = database or self.database
-        result = self.execute_query(f"DESCRIBE {db}.{table}", max_rows=500)
-        return self._normalize_describe_rows(result)
+        key = self._cache_key(db, table)
+        cached = self._schema_cache.get(key)
+        if cached is None:
+            try:
+                cached = self._describe_table_from_metadata(table, db)
+            except ClientError:
+                # Fall back to the query engine, e.g. when Glue metadata access is denied.
+                rows = list(self.execute_query_iter(f"DESCRIBE {db}.{table}", max_rows=500))
+                cached = self._normalize_describe_rows(rows)
+            self._schema_cache[key] = cached
+        return list(cached)
+
+    def _describe_table_from_metadata(self, table: str, database: str) -> list[dict[str, Any]]:
+        """
+        Read a table schema via `GetTableMetadata`, skipping query execution entirely.
+        Rows mirror the Hive-style DESCRIBE output: all columns (partition keys included),
+        then a `# Partition Information` section.
+        """
+        response = self._client.get_table_metadata(
+            CatalogName="AwsDataCatalog", DatabaseName=database, TableName=table
+        )
+        return self._metadata_to_describe_rows(response["TableMetadata"])
+
+    @staticmethod
+    def _metadata_to_describe_rows(metadata: dict[str, Any]) -> list[dict[str, Any]]:
+        def to_row(col: dict[str, Any]) -> dict[str, Any]:
+            return {
+                "col_name": col.get("Name") or "",
+                "data_type": col.get("Type") or "",
+                "comment": col.get("Comment") or "",
+            }
+
+        columns = [to_row(c) for c in metadata.get("Columns", [])]
+        partitions = [to_row(c) for c in metadata.get("PartitionKeys", [])]
+        rows = columns + partitions
+        if partitions:
+            rows.append({"col_name": "", "data_type": "", "comment": ""})
+            rows.append({"col_name": "# Partition Information", "data_type": "", "comment": ""})
+            rows.append({"col_name": "# col_name", "data_type": "data_type", "comment": "comment"})
+            rows.extend(partitions)
+        return rows
+
+    def describe_tables_bulk(self, full_table_names: list[str]) -> dict[str, list[dict]]:
+        """
+        Fetch schemas for many fully-qualified tables (db.table) with one paginated
+        `ListTableMetadata` call per database instead of one request per table.
+        Results are added to the session cache. Tables that cannot be resolved this way
+        (not found, or metadata access denied) are omitted; use `describe_table_fq` for them.
+        """
+        out: dict[str, list[dict]] = {}
+        by_database: dict[str, dict[str, str]] = {}
+        for ref in full_table_names:
+            ref = ref.strip()
+            db, table = ref.split(".", 1) if "." in ref else (self.database, ref)
+            key = self._cache_key(db, table)
+            if key in self._schema_cache:
+                out[ref] = list(self._schema_cache[key])
+            else:
+                by_database.setdefault(db, {})[key[1]] = ref
+
+        paginator = self._client.get_paginator("list_table_metadata")
+        for db, wanted in by_database.items():
+            # The expression is a name filter; matches are narrowed to the exact tables below.
+            expression = "|".join(sorted(re.escape(name) for name in wanted))
+            try:
+                for page in paginator.paginate(
+                    CatalogName="AwsDataCatalog", DatabaseName=db, Expression=expression
+                ):
+                    for metadata in page.get("TableMetadataList", []):
+                        ref = wanted.get((metadata.get("Name") or "").lower())
+                        if ref is None:
+                            continue
+                        rows = self._metadata_to_describe_rows(metadata)
+                        self._schema_cache[self._cache_key(db, ref.split(".", 1)[-1])] = rows
+                        out[ref] = list(rows)
+            except ClientError:
+                continue
+        return out
 
     def describe_table_fq(self, full_table_name: str) -> list[dict]:
         """Get schema information for a fully-qualified table (db.table)."""
@@ -228,58 +854,52 @@ class AthenaClient:
         return self.describe_table(table, database=db)
 
     @staticmethod
-    def _normalize_describe_rows(result: QueryResult) -> list[dict[str, Any]]:
+    def _normalize_describe_rows(rows: list[dict[str, Any]]) -> list[dict[str, Any]]:
         """
         Athena DESCRIBE sometimes returns a single tab-separated column in `col_name`
         even when metadata advertises multiple columns.
-        Normalize to `{col_name, data_type, comment}` rows.
+        Normalize to `{col_name, data_type, comment}` rows (in place).
         """
-        if not result.rows:
+        if not rows:
             return []
-        if "col_name" not in result.columns:
-            return result.rows
+        if "col_name" not in rows[0]:
+            return rows
 
         # Heuristic: if rows only contain `col_name` with embedded tabs, parse it.
-        has_tab = any("\t" in (row.get("col_name") or "") for row in result.rows)
+        has_tab = any("\t" in (row.get("col_name") or "") for row in rows)
         has_other_cols = any(
-            any(k for k in row.keys() if k != "col_name") for row in result.rows
+            any(k for k in row.keys() if k != "col_name") for row in rows
         )
         if not has_tab or has_other_cols:
-            return result.rows
+            return rows
 
-        normalized: list[dict[str, Any]] = []
-        for row in result.rows:
+        for i, row in enumerate(rows):
             raw = (row.get("col_name") or "").rstrip("\n")
             parts = raw.split("\t")
             parts += ["", "", ""]
-            normalized.append(
-                {
-                    "col_name": parts[0].strip(),
-                    "data_type": parts[1].strip(),
-                    "comment": parts[2].strip(),
-                }
-            )
-        return normalized
+            rows[i] = {
+                "col_name": parts[0].strip(),
+                "data_type": parts[1].strip(),
+                "comment": parts[2].strip(),
+            }
+        return rows
 
     def show_create_table_fq(self, full_table_name: str) -> str:
-        """Return the CREATE TABLE statement for a fully-qualified table (db.table)."""
+        """Return the CREATE TABLE statement for a fully-qualified table (db.table), cached per session."""
         full_table_name = full_table_name.strip()
         if "." not in full_table_name:
             full_table_name = f"{self.database}.{full_table_name}"
-        result = self.execute_query(f"SHOW CREATE TABLE {full_table_name}", max_rows=1000)
-        if not result.rows:
-            return ""
+        key = self._cache_key(*full_table_name.split(".", 1))
+        cached = self._ddl_cache.get(key)
+        if cached is not None:
+            return cached
+
         # Athena returns a single column (typically `createtab_stmt`) with one line per row.
-        col = result.columns[0] if result.columns else None
-        lines: list[str] = []
-        for row in result.rows:
-            if not row:
-                continue
-            if col and col in row and row[col] is not None:
-                lines.append(str(row[col]))
-            else:
-                lines.append(str(next(iter(row.values()))))
-        return "\n".join(lines).rstrip()
+        rows = self.execute_query_iter(f"SHOW CREATE TABLE {full_table_name}", max_rows=1000)
+        # Blank DDL lines come back as NULL cells; keep them as empty lines, not "None".
+        ddl = "\n".join(str(next(iter(row.values())) or "") for row in rows if row).rstrip()
+        self._ddl_cache[key] = ddl
+        return ddl
 
     def get_sample_data(
         self, table: str, limit: int = 10, database: str | None = None
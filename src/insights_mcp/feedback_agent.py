@@ -2,36 +2,110 @@
 Feedback Agent - Analyzes feedback files and generates actionable improvements for the knowledge base.
 """
 
+import io
 import os
+import re
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from typing import List, Dict
 import json
 
+# Below this many feedback files, analysing them inline beats spawning worker processes.
+PARALLEL_ANALYSIS_MIN_FILES = 8
+
+
+# Feedback categories: (category, action, trigger keywords, keywords that select detail lines)
+FEEDBACK_CATEGORIES = [
+    (
+        "Catalog",
+        "Review and update catalog.txt based on feedback about tables, schemas, or columns",
+        ["catalog", "table", "schema", "column", "missing table", "unclear column"],
+        ["catalog", "table", "schema", "column"],
+    ),
+    (
+        "Domain",
+        "Update domain.txt with missing business context or clarify terminology",
+        ["domain", "business", "terminology", "definition", "context", "unclear"],
+        ["domain", "business", "terminology", "definition"],
+    ),
+    (
+        "Metrics",
+        "Review and update metrics.txt with missing or unclear metric definitions",
+        ["metric", "calculation", "formula", "computation", "measure"],
+        ["metric", "calculation", "formula"],
+    ),
+    (
+        "Examples",
+        "Add or update examples in examples.txt or queries/ directory",
+        ["example", "query", "template", "pattern", "sql"],
+        ["example", "query", "template", "pattern"],
+    ),
+    (
+        "General",
+        "Address identified gaps in the knowledge base",
+        ["gap", "missing", "incomplete", "unavailable", "not found"],
+        ["gap", "missing", "incomplete"],
+    ),
+]
+
+
+def _build_keyword_matcher(categories):
+    """
+    Compile every category keyword into one pattern so feedback is scanned in a single pass.
+
+    The pattern is a case-insensitive zero-width lookahead with one group per keyword, so a
+    match is reported at every position and overlapping keywords are not lost. At any position
+    the longest keyword wins; every shorter keyword at that position is a substring of it, so
+    each keyword maps to all categories with a keyword contained in it (e.g. "unclear column"
+    -> Catalog and Domain). Lookup tables are indexed by the matching group number.
+    """
+    keywords = sorted(
+        {kw for _, _, triggers, details in categories for kw in triggers + details},
+        key=len,
+        reverse=True,
+    )
+    pattern = re.compile(
+        "(?=" + "|".join(f"({re.escape(kw)})" for kw in keywords) + ")",
+        re.IGNORECASE,
+    )
+    # Index 0 is unused: regex groups are numbered from 1.
+    triggered_by = [set()] + [
+        {cat for cat, _, triggers, _ in categories if any(t in kw for t in triggers)}
+        for kw in keywords
+    ]
+    detail_of = [set()] + [
+        {cat for cat, _, _, details in categories if any(d in kw for d in details)}
+        for kw in keywords
+    ]
+    return pattern, triggered_by, detail_of
 
-def load_knowledge_base(knowledge_dir: Path) -> Dict[str, str]:
-    """Load all knowledge base files into a dictionary."""
-    knowledge = {}
-    
-    # Load main knowledge files
-    for file_name in ["catalog.txt", "domain.txt", "metrics.txt", "examples.txt"]:
-        file_path = knowledge_dir / file_name
-        if file_path.exists():
-            knowledge[file_name] = file_path.read_text(encoding="utf-8")
-    
-    # Load query files
-    queries_dir = knowledge_dir / "queries"
-    if queries_dir.exists():
-        for query_file in queries_dir.glob("*.sql"):
-            knowledge[f"queries/{query_file.name}"] = query_file.read_text(encoding="utf-8")
-    
-    return knowledge
 
+_KEYWORD_PATTERN, _TRIGGERED_BY, _DETAIL_OF = _build_keyword_matcher(FEEDBACK_CATEGORIES)
 
-def analyze_feedback_file(feedback_file: Path, knowledge: Dict[str, str]) -> List[str]:
+
+def _scan_keywords(text: str):
+    """Return (categories triggered, {category: line indices with a detail keyword}) in one pass."""
+    triggered = set()
+    detail_lines = {}
+    line_no = 0
+    last_pos = 0
+    for match in _KEYWORD_PATTERN.finditer(text):
+        keyword_index = match.lastindex
+        pos = match.start()
+        line_no += text.count("\n", last_pos, pos)
+        last_pos = pos
+        triggered |= _TRIGGERED_BY[keyword_index]
+        for category in _DETAIL_OF[keyword_index]:
+            detail_lines.setdefault(category, set()).add(line_no)
+    return triggered, detail_lines
+
+
+def analyze_feedback_file(feedback_file: Path) -> List[str]:
     """
     Analyze a single feedback file and generate actionable items.
     
-    This function analyzes the feedback content against the knowledge base
+    This function scans the feedback content for knowledge-base categories
     and generates specific, actionable improvements.
     """
     print(f"\n{'='*60}")
@@ -42,53 +116,18 @@ def analyze_feedback_file(feedback_file: Path, knowledge: Dict[str, str]) -> Lis
     
     actionables = []
     
-    # Analyze feedback for different types of issues
-    feedback_lower = feedback_content.lower()
-    
-    # Check for catalog-related feedback
-    if any(keyword in feedback_lower for keyword in ["catalog", "table", "schema", "column", "missing table", "unclear column"]):
-        actionables.append({
-            "category": "Catalog",
-            "file": feedback_file.name,
-            "action": "Review and update catalog.txt based on feedback about tables, schemas, or columns",
-            "details": _extract_relevant_section(feedback_content, ["catalog", "table", "schema", "column"])
-        })
+    # Analyze feedback for different types of issues (case-insensitive, no lowercased copy)
+    triggered, detail_lines = _scan_keywords(feedback_content)
+    lines = feedback_content.split('\n')
     
-    # Check for domain-related feedback
-    if any(keyword in feedback_lower for keyword in ["domain", "business", "terminology", "definition", "context", "unclear"]):
-        actionables.append({
-            "category": "Domain",
-            "file": feedback_file.name,
-            "action": "Update domain.txt with missing business context or clarify terminology",
-            "details": _extract_relevant_section(feedback_content, ["domain", "business", "terminology", "definition"])
-        })
-    
-    # Check for metrics-related feedback
-    if any(keyword in feedback_lower for keyword in ["metric", "calculation", "formula", "computation", "measure"]):
-        actionables.append({
-            "category": "Metrics",
-            "file": feedback_file.name,
-            "action": "Review and update metrics.txt with missing or unclear metric definitions",
-            "details": _extract_relevant_section(feedback_content, ["metric", "calculation", "formula"])
-        })
-    
-    # Check for examples-related feedback
-    if any(keyword in feedback_lower for keyword in ["example", "query", "template", "pattern", "sql"]):
-        actionables.append({
-            "category": "Examples",
-            "file": feedback_file.name,
-            "action": "Add or update examples in examples.txt or queries/ directory",
-            "details": _extract_relevant_section(feedback_content, ["example", "query", "template", "pattern"])
-        })
-    
-    # Check for general gaps or missing information
-    if any(keyword in feedback_lower for keyword in ["gap", "missing", "incomplete", "unavailable", "not found"]):
-        actionables.append({
-            "category": "General",
-            "file": feedback_file.name,
-            "action": "Address identified gaps in the knowledge base",
-            "details": _extract_relevant_section(feedback_content, ["gap", "missing", "incomplete"])
-        })
+    for category, action, _, _ in FEEDBACK_CATEGORIES:
+        if category in triggered:
+            actionables.append({
+                "category": category,
+                "file": feedback_file.name,
+                "action": action,
+                "details": _section_from_hit_lines(feedback_content, lines, detail_lines.get(category, ()))
+            })
     
     # If no specific category matches, create a general actionable
     if not actionables:
@@ -103,18 +142,25 @@ def analyze_feedback_file(feedback_file: Path, knowledge: Dict[str, str]) -> Lis
     return actionables
 
 
-def _extract_relevant_section(content: str, keywords: List[str]) -> str:
-    """Extract relevant sections from feedback content based on keywords."""
-    lines = content.split('\n')
+def _section_from_hit_lines(content: str, lines: List[str], hit_lines) -> str:
+    """
+    Build the detail excerpt around the given keyword-hit line indices.
+
+    Each hit contributes the line plus some context; overlapping windows are merged so no
+    line is repeated, and collection stops once the 20-line limit is reached.
+    """
     relevant_lines = []
+    covered_end = 0
     
-    for i, line in enumerate(lines):
-        line_lower = line.lower()
-        if any(keyword in line_lower for keyword in keywords):
-            # Include the line and some context
-            start = max(0, i - 2)
-            end = min(len(lines), i + 5)
+    for i in sorted(hit_lines):
+        # Include the line and some context, skipping lines already taken
+        start = max(covered_end, i - 2)
+        end = min(len(lines), i + 5)
+        if start < end:
             relevant_lines.extend(lines[start:end])
+            covered_end = end
+        if len(relevant_lines) >= 20:
+            break
     
     if relevant_lines:
         return '\n'.join(relevant_lines[:20])  # Limit to 20 lines
@@ -131,57 +177,44 @@ def consolidate_actionables(all_actionables: List[Dict]) -> List[Dict]:
     print(f"Consolidating {len(all_actionables)} actionables...")
     print(f"{'='*60}")
     
-    # Group by category
-    by_category = {}
+    # Group by category and similar action (first 100 chars of the action)
+    groups = defaultdict(list)
     for actionable in all_actionables:
-        category = actionable["category"]
-        if category not in by_category:
-            by_category[category] = []
-        by_category[category].append(actionable)
+        groups[(actionable["category"], actionable["action"][:100])].append(actionable)
     
     consolidated = []
     
-    # Consolidate within each category
-    for category, items in by_category.items():
-        # Group by similar actions
-        action_groups = {}
-        for item in items:
-            action_key = item["action"][:100]  # Use first 100 chars as key
-            if action_key not in action_groups:
-                action_groups[action_key] = []
-            action_groups[action_key].append(item)
-        
-        # Create consolidated items
-        for action_key, group_items in action_groups.items():
-            if len(group_items) == 1:
-                consolidated.append(group_items[0])
-            else:
-                # Merge multiple similar items
-                files = [item["file"] for item in group_items]
-                details = "\n\n---\n\n".join([f"From {item['file']}:\n{item['details']}" for item in group_items])
-                
-                consolidated.append({
-                    "category": category,
-                    "file": f"Multiple files ({len(files)}): {', '.join(files[:3])}{'...' if len(files) > 3 else ''}",
-                    "action": group_items[0]["action"],
-                    "details": details,
-                    "priority": "High" if len(group_items) > 2 else "Medium"
-                })
+    # Create consolidated items
+    for (category, _), group_items in groups.items():
+        if len(group_items) == 1:
+            consolidated.append(group_items[0])
+        else:
+            # Merge multiple similar items
+            files = [item["file"] for item in group_items]
+            details = "\n\n---\n\n".join([f"From {item['file']}:\n{item['details']}" for item in group_items])
+            
+            consolidated.append({
+                "category": category,
+                "file": f"Multiple files ({len(files)}): {', '.join(files[:3])}{'...' if len(files) > 3 else ''}",
+                "action": group_items[0]["action"],
+                "details": details,
+                "priority": "High" if len(group_items) > 2 else "Medium"
+            })
     
     return consolidated
 
 
 def generate_final_report(consolidated_actionables: List[Dict], output_file: Path):
     """Generate a final consolidated report of all actionables."""
-    report_lines = [
-        "# Consolidated Feedback Actionables",
-        "",
-        f"Generated from analysis of feedback files.",
-        f"Total actionable items: {len(consolidated_actionables)}",
-        "",
-        "---",
-        ""
-    ]
+    buf = io.StringIO()
+    w = buf.write
+    w("# Consolidated Feedback Actionables\n")
+    w("\n")
+    w("Generated from analysis of feedback files.\n")
+    w(f"Total actionable items: {len(consolidated_actionables)}\n")
+    w("\n")
+    w("---\n")
+    w("\n")
     
     # Group by category for better organization
     by_category = {}
@@ -193,36 +226,36 @@ def generate_final_report(consolidated_actionables: List[Dict], output_file: Pat
     
     # Write report by category
     for category in sorted(by_category.keys()):
-        report_lines.append(f"## {category} Improvements")
-        report_lines.append("")
+        w(f"## {category} Improvements\n")
+        w("\n")
         
         for i, actionable in enumerate(by_category[category], 1):
             priority = actionable.get("priority", "Medium")
-            report_lines.append(f"### {i}. {actionable['action']}")
-            report_lines.append("")
-            report_lines.append(f"**Source**: {actionable['file']}")
+            w(f"### {i}. {actionable['action']}\n")
+            w("\n")
+            w(f"**Source**: {actionable['file']}\n")
             if priority != "Medium":
-                report_lines.append(f"**Priority**: {priority}")
-            report_lines.append("")
-            report_lines.append("**Details:**")
-            report_lines.append("```")
-            report_lines.append(actionable['details'][:1000])  # Limit details length
-            report_lines.append("```")
-            report_lines.append("")
-            report_lines.append("---")
-            report_lines.append("")
+                w(f"**Priority**: {priority}\n")
+            w("\n")
+            w("**Details:**\n")
+            w("```\n")
+            w(actionable['details'][:1000])  # Limit details length
+            w("\n```\n")
+            w("\n")
+            w("---\n")
+            w("\n")
     
     # Write summary
-    report_lines.append("## Summary")
-    report_lines.append("")
-    report_lines.append(f"- **Total actionables**: {len(consolidated_actionables)}")
-    report_lines.append(f"- **Categories**: {', '.join(sorted(by_category.keys()))}")
+    w("## Summary\n")
+    w("\n")
+    w(f"- **Total actionables**: {len(consolidated_actionables)}\n")
+    w(f"- **Categories**: {', '.join(sorted(by_category.keys()))}\n")
     
     high_priority = [a for a in consolidated_actionables if a.get("priority") == "High"]
     if high_priority:
-        report_lines.append(f"- **High priority items**: {len(high_priority)}")
+        w(f"- **High priority items**: {len(high_priority)}\n")
     
-    report_content = "\n".join(report_lines)
+    report_content = buf.getvalue()
     output_file.write_text(report_content, encoding="utf-8")
     
     print(f"\nFinal report saved to: {output_file}")
@@ -234,7 +267,6 @@ def main():
     # Get paths
     repo_root = Path(__file__).resolve().parents[2]
     feedback_dir = repo_root / "feedback"
-    knowledge_dir = repo_root / "knowledge"
     output_file = repo_root / "feedback" / "consolidated_actionables.md"
     
     print("="*60)
@@ -246,16 +278,13 @@ def main():
         print(f"Error: Feedback directory not found: {feedback_dir}")
         return
     
-    # Load knowledge base
-    print(f"\nLoading knowledge base from: {knowledge_dir}")
-    knowledge = load_knowledge_base(knowledge_dir)
-    print(f"Loaded {len(knowledge)} knowledge files")
-    
     # Find all feedback files (excluding README.md and output file)
-    feedback_files = [
-        f for f in feedback_dir.iterdir()
-        if f.is_file() and f.name not in ["README.md", "consolidated_actionables.md"]
-    ]
+    skip_names = {"README.md", "consolidated_actionables.md"}
+    with os.scandir(feedback_dir) as entries:
+        feedback_files = [
+            Path(entry.path) for entry in entries
+            if entry.name not in skip_names and entry.is_file()
+        ]
     
     if not feedback_files:
         print(f"\nNo feedback files found in {feedback_dir}")
@@ -264,15 +293,29 @@ def main():
     
     print(f"\nFound {len(feedback_files)} feedback file(s) to process")
     
-    # Process each feedback file
+    # Process each feedback file (in worker processes once there are enough files
+    # to outweigh process start-up; results are collected in sorted file order)
     all_actionables = []
-    for feedback_file in sorted(feedback_files):
-        try:
-            actionables = analyze_feedback_file(feedback_file, knowledge)
-            all_actionables.extend(actionables)
-        except Exception as e:
-            print(f"Error processing {feedback_file.name}: {e}")
-            continue
+    feedback_files = sorted(feedback_files)
+    if len(feedback_files) >= PARALLEL_ANALYSIS_MIN_FILES:
+        with ProcessPoolExecutor() as executor:
+            futures = [
+                executor.submit(analyze_feedback_file, feedback_file)
+                for feedback_file in feedback_files
+            ]
+            for feedback_file, future in zip(feedback_files, futures):
+                try:
+                    all_actionables.extend(future.result())
+                except Exception as e:
+                    print(f"Error processing {feedback_file.name}: {e}")
+    else:
+        for feedback_file in feedback_files:
+            try:
+                actionables = analyze_feedback_file(feedback_file)
+                all_actionables.extend(actionables)
+            except Exception as e:
+                print(f"Error processing {feedback_file.name}: {e}")
+                continue
     
     if not all_actionables:
         print("\nNo actionables generated from feedback files")
@@ -11,81 +11,159 @@ Outputs:
 from __future__ import annotations
 
 import argparse
+import filecmp
+import hashlib
+import io
+import json
+import os
 import re
-from dataclasses import dataclass
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from functools import lru_cache
+from itertools import islice
 from pathlib import Path
-from typing import Any
+from typing import Any, Callable
 
 from .athena import AthenaClient, QueryResult
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class QueryFile:
     name: str
     path: Path
     sql: str
 
 
-TABLE_REF_RE = re.compile(r"\b(d11_[a-zA-Z0-9_]+)\.([a-zA-Z0-9_]+)\b")
+# Table schemas cached on disk are refetched after this long (or with --refresh-schema).
+SCHEMA_CACHE_TTL_SECONDS = 24 * 60 * 60
+# Cached sample-query results are re-run after this long (or with --rerun-queries),
+# even if their SQL is unchanged, so previews don't show stale data.
+RESULT_CACHE_TTL_SECONDS = 24 * 60 * 60
 
+TABLE_REF_RE = re.compile(r"\b(d11_\w+)\.(\w+)\b", re.ASCII)
 
+
+@lru_cache(maxsize=1)
 def _repo_root() -> Path:
     return Path(__file__).resolve().parents[2]
 
 
+@lru_cache(maxsize=1)
 def _knowledge_dir() -> Path:
     return _repo_root() / "knowledge"
 
 
+@lru_cache(maxsize=1)
 def _queries_dir() -> Path:
     return _knowledge_dir() / "queries"
 
 
 def _read_query_files(dir_path: Path) -> list[QueryFile]:
-    files = sorted(dir_path.glob("*.sql"), key=lambda p: p.name.lower())
-    out: list[QueryFile] = []
-    for p in files:
-        sql = p.read_text(encoding="utf-8").strip()
-        if not sql:
-            continue
-        out.append(QueryFile(name=p.stem, path=p, sql=sql))
-    return out
+    if not dir_path.is_dir():
+        return []
+    with os.scandir(dir_path) as entries:
+        files = [entry for entry in entries if entry.name.endswith(".sql") and entry.is_file()]
+    files.sort(key=lambda entry: entry.name.lower())
+
+    def read_sql(entry: os.DirEntry[str]) -> str:
+        with open(entry.path, encoding="utf-8") as f:
+            return f.read().strip()
+
+    # Open/read latency dominates on network filesystems, so read the files concurrently.
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        sqls = list(executor.map(read_sql, files))
+    paths = [Path(entry.path) for entry in files]
+    return [QueryFile(name=p.stem, path=p, sql=sql) for p, sql in zip(paths, sqls) if sql]
+
+
+def _schema_cache_path(cache_dir: Path, table_ref: str) -> Path:
+    return cache_dir / "schema" / f"{table_ref}.json"
+
+
+def _load_cached_schema(cache_dir: Path, table_ref: str, ttl_seconds: float) -> dict[str, Any]:
+    """Return the cached `{"schema": [...], "ddl": "..."}` entry for a table, or {} if missing/stale."""
+    path = _schema_cache_path(cache_dir, table_ref)
+    try:
+        if time.time() - os.path.getmtime(path) > ttl_seconds:
+            return {}
+        return json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_cached_schema(cache_dir: Path, table_ref: str, entry: dict[str, Any]) -> None:
+    path = _schema_cache_path(cache_dir, table_ref)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(entry), encoding="utf-8")
+
+
+def _query_hash(sql: str) -> str:
+    return hashlib.sha256(sql.encode("utf-8")).hexdigest()
+
+
+def _load_manifest(cache_dir: Path) -> dict[str, dict[str, Any]]:
+    """Return `{query name: {"sha256", "tables", "preview_rows", "fetched_at"}}` from the last run, or {}."""
+    try:
+        return json.loads((cache_dir / "manifest.json").read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_manifest(cache_dir: Path, manifest: dict[str, dict[str, Any]]) -> None:
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    (cache_dir / "manifest.json").write_text(json.dumps(manifest, indent=2, sort_keys=True), encoding="utf-8")
+
+
+def _result_cache_path(cache_dir: Path, query_name: str) -> Path:
+    return cache_dir / "results" / f"{query_name}.json"
+
+
+def _load_cached_result(cache_dir: Path, query_name: str) -> QueryResult | None:
+    try:
+        data = json.loads(_result_cache_path(cache_dir, query_name).read_text(encoding="utf-8"))
+        return QueryResult(**data)
+    except (OSError, ValueError, TypeError):
+        return None
+
+
+def _save_cached_result(cache_dir: Path, query_name: str, result: QueryResult) -> None:
+    path = _result_cache_path(cache_dir, query_name)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(asdict(result), default=str), encoding="utf-8")
 
 
 def _extract_table_refs(sql: str) -> list[str]:
-    refs = {f"{m.group(1)}.{m.group(2)}" for m in TABLE_REF_RE.finditer(sql)}
-    return sorted(refs)
+    return sorted({f"{schema}.{table}" for schema, table in TABLE_REF_RE.findall(sql)})
 
 
 def _format_markdown_table(columns: list[str], rows: list[dict[str, Any]], max_rows: int) -> str:
     if not columns:
         return ""
-    lines: list[str] = []
-    lines.append("| " + " | ".join(columns) + " |")
-    lines.append("| " + " | ".join(["---"] * len(columns)) + " |")
-    for row in rows[:max_rows]:
-        values = [str(row.get(col, "NULL"))[:80] for col in columns]
-        lines.append("| " + " | ".join(values) + " |")
+    buf = io.StringIO()
+    buf.write("| " + " | ".join(columns) + " |\n")
+    buf.write("| " + " | ".join(["---"] * len(columns)) + " |\n")
+    nulls = ["NULL"] * len(columns)
+    for row in islice(rows, max_rows):
+        # map() drives row.get from C; only the per-cell str/truncate stays in Python.
+        buf.write("| " + " | ".join([str(v)[:80] for v in map(row.get, columns, nulls)]) + " |\n")
     if len(rows) > max_rows:
-        lines.append(f"\n... and {len(rows) - max_rows} more rows (truncated)")
-    return "\n".join(lines)
+        buf.write(f"\n... and {len(rows) - max_rows} more rows (truncated)\n")
+    return buf.getvalue().rstrip("\n")
 
 
 def _format_query_result_preview(result: QueryResult, max_rows: int = 20) -> str:
-    lines: list[str] = []
+    buf = io.StringIO()
+    buf.write(f"- Query ID: {result.query_execution_id}\n")
+    buf.write(f"- Rows returned (client-capped): {len(result.rows)}\n")
     if result.statistics:
         scanned = result.statistics.get("DataScannedInBytes", 0)
         exec_ms = result.statistics.get("TotalExecutionTimeInMillis", 0)
-        lines.append(f"- Query ID: {result.query_execution_id}")
-        lines.append(f"- Rows returned (client-capped): {len(result.rows)}")
-        lines.append(f"- Data scanned: {scanned / 1024 / 1024:.2f} MB")
-        lines.append(f"- Execution time: {exec_ms / 1000:.2f}s")
-    else:
-        lines.append(f"- Query ID: {result.query_execution_id}")
-        lines.append(f"- Rows returned (client-capped): {len(result.rows)}")
-    lines.append("")
-    lines.append(_format_markdown_table(result.columns, result.rows, max_rows=max_rows))
-    return "\n".join(lines).strip()
+        buf.write(f"- Data scanned: {scanned / 1024 / 1024:.2f} MB\n")
+        buf.write(f"- Execution time: {exec_ms / 1000:.2f}s\n")
+    buf.write("\n")
+    buf.write(_format_markdown_table(result.columns, result.rows, max_rows=max_rows))
+    return buf.getvalue().strip()
 
 
 def _format_schema(describe_rows: list[dict[str, Any]]) -> str:
@@ -112,17 +190,20 @@ def _format_schema(describe_rows: list[dict[str, Any]]) -> str:
         else:
             cols.append((col_name, data_type, comment))
 
-    def render_table(rows: list[tuple[str, str, str]]) -> str:
+    def render_table(buf: io.StringIO, rows: list[tuple[str, str, str]]) -> None:
         if not rows:
-            return "_(none)_"
-        lines = ["| Column | Type | Comment |", "| --- | --- | --- |"]
+            buf.write("_(none)_\n")
+            return
+        buf.write("| Column | Type | Comment |\n| --- | --- | --- |\n")
         for c, t, cm in rows:
-            lines.append(f"| {c} | {t} | {cm} |")
-        return "\n".join(lines)
+            buf.write(f"| {c} | {t} | {cm} |\n")
 
-    out = ["**Columns**", "", render_table(cols), ""]
-    out += ["**Partition columns**", "", render_table(partition_cols)]
-    return "\n".join(out).strip()
+    buf = io.StringIO()
+    buf.write("**Columns**\n\n")
+    render_table(buf, cols)
+    buf.write("\n**Partition columns**\n\n")
+    render_table(buf, partition_cols)
+    return buf.getvalue().strip()
 
 
 def _columns_from_schema(describe_rows: list[dict[str, Any]]) -> list[tuple[str, str]]:
@@ -136,224 +217,501 @@ def _columns_from_schema(describe_rows: list[dict[str, Any]]) -> list[tuple[str,
     return cols
 
 
-def _infer_grain(columns: list[tuple[str, str]]) -> str:
-    names = {c[0].lower() for c in columns}
-    if "hour_bucket" in names or "hour_of_day" in names:
-        return "hour"
-    if "day_ist" in names or "eventdate" in names:
-        return "day"
-    if "rec_updated_at" in names or "recupdatedat" in names:
-        return "event-time"
+_GRAIN_MARKERS: tuple[tuple[str, frozenset[str]], ...] = (
+    ("hour", frozenset({"hour_bucket", "hour_of_day"})),
+    ("day", frozenset({"day_ist", "eventdate"})),
+    ("event-time", frozenset({"rec_updated_at", "recupdatedat"})),
+)
+
+# Key columns listed first in domain.txt (time + id-like fields), by rank.
+_PREFERRED_RANK: dict[str, int] = {
+    name: i
+    for i, name in enumerate(
+        ["day_ist", "eventdate", "hour_bucket", "hour_of_day", "id", "userid", "customer_id", "influencerid"]
+    )
+}
+
+
+def _infer_grain(names: set[str]) -> str:
+    """Infer table grain from its lower-cased column names."""
+    for grain, markers in _GRAIN_MARKERS:
+        if not markers.isdisjoint(names):
+            return grain
     return "unknown"
 
 
+# Keep these descriptions conservative: "seems to" and "used for".
+_TABLE_DESCRIPTIONS: dict[str, str] = {
+    "d11_stitch.daylevel_metric": "Daily rollup of core engagement + streaming + monetization metrics (used as the primary day-level fact).",
+    "d11_stitch.daylevel_engagedpaid": "Daily rollup of engaged/paid users and interaction counts (chats, reactions, predictions, etc).",
+    "d11_stitch.cjusers": "Daily user count for the CJ cohort (exact definition needs confirmation; used as a daily users series).",
+    "d11_stitch.day_hour_watchtime": "Watch time (seconds) aggregated by day/hour for watch-along streams.",
+    "d11_stitch.timespentonmoment": "Cumulative watch minutes on moments by hourly bucket (take last bucket per day for daily total).",
+    "d11_stitch.moment_raw": "Daily moments uploaded and total uploaded duration (seconds).",
+    "d11_stitch.sportan_userid_new": "List of SPORTAN user IDs (used to exclude internal/special accounts).",
+    "d11_transactions.dreambucks_account_ledger": "Transactional DreamBucks ledger (debits/credits) used to compute DB spend and purchases.",
+    "d11_transactions.live_streaming_stream": "Raw livestream records (start/end, status, influencer/creator).",
+    "d11_transactions.dream11_userregistration": "User registration table; used here to identify SPORTAN users by `usertype`.",
+}
+
+
 def _table_description(table_ref: str) -> str:
-    # Keep these descriptions conservative: "seems to" and "used for".
-    return {
-        "d11_stitch.daylevel_metric": "Daily rollup of core engagement + streaming + monetization metrics (used as the primary day-level fact).",
-        "d11_stitch.daylevel_engagedpaid": "Daily rollup of engaged/paid users and interaction counts (chats, reactions, predictions, etc).",
-        "d11_stitch.cjusers": "Daily user count for the CJ cohort (exact definition needs confirmation; used as a daily users series).",
-        "d11_stitch.day_hour_watchtime": "Watch time (seconds) aggregated by day/hour for watch-along streams.",
-        "d11_stitch.timespentonmoment": "Cumulative watch minutes on moments by hourly bucket (take last bucket per day for daily total).",
-        "d11_stitch.moment_raw": "Daily moments uploaded and total uploaded duration (seconds).",
-        "d11_stitch.sportan_userid_new": "List of SPORTAN user IDs (used to exclude internal/special accounts).",
-        "d11_transactions.dreambucks_account_ledger": "Transactional DreamBucks ledger (debits/credits) used to compute DB spend and purchases.",
-        "d11_transactions.live_streaming_stream": "Raw livestream records (start/end, status, influencer/creator).",
-        "d11_transactions.dream11_userregistration": "User registration table; used here to identify SPORTAN users by `usertype`.",
-    }.get(table_ref, "Referenced by sample queries.")
+    return _TABLE_DESCRIPTIONS.get(table_ref, "Referenced by sample queries.")
 
 
-def generate_docs(
+def _describe_one(athena: AthenaClient, table_ref: str) -> tuple[str, list[dict[str, Any]]]:
+    try:
+        return table_ref, athena.describe_table_fq(table_ref)
+    except Exception as e:
+        return table_ref, [{"col_name": "__ERROR__", "data_type": str(e), "comment": ""}]
+
+
+def _ddl_one(athena: AthenaClient, table_ref: str) -> tuple[str, str]:
+    try:
+        return table_ref, athena.show_create_table_fq(table_ref)
+    except Exception:
+        return table_ref, ""
+
+
+@dataclass(frozen=True, slots=True)
+class _DocInputs:
+    """Everything the doc writers need, gathered once from Athena (or the cache)."""
+
+    query_files: list[QueryFile]
+    query_tables: dict[str, list[str]]
+    all_tables: list[str]
+    schemas: dict[str, list[dict[str, Any]]]
+    create_ddls: dict[str, str]
+    executed: dict[str, QueryResult | None]
+    exec_errors: dict[str, str]
+    preview_rows: int
+
+
+class _RStripWriter(io.TextIOBase):
+    """
+    Forwards writes to `out` but holds back trailing whitespace, so a document ends
+    with exactly one newline (same as `text.rstrip() + "\n"`) without buffering it whole.
+    """
+
+    def __init__(self, out: io.TextIOBase) -> None:
+        super().__init__()
+        self._out = out
+        self._pending = ""
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, text: str) -> int:
+        stripped = text.rstrip()
+        if stripped:
+            self._out.write(self._pending)
+            self._out.write(stripped)
+            self._pending = text[len(stripped):]
+        else:
+            self._pending += text
+        return len(text)
+
+    def finish(self) -> None:
+        self._out.write("\n")
+
+
+def _prepare_docs(
     *,
     athena: AthenaClient,
     query_files: list[QueryFile],
-    row_limit: int,
     preview_rows: int,
     include_show_create: bool,
-) -> dict[str, str]:
-    # Collect table refs from all queries
-    table_refs: set[str] = set()
-    for q in query_files:
-        table_refs.update(_extract_table_refs(q.sql))
-    all_tables = sorted(table_refs)
-
-    # Describe schemas
-    schemas: dict[str, list[dict[str, Any]]] = {}
-    create_ddls: dict[str, str] = {}
-    for t in all_tables:
+    result_reuse_enable: bool = True,
+    result_reuse_minutes: int = 60,
+    cache_dir: Path | None = None,
+    schema_ttl_seconds: float = SCHEMA_CACHE_TTL_SECONDS,
+    result_ttl_seconds: float = RESULT_CACHE_TTL_SECONDS,
+    refresh_schema: bool = False,
+    rerun_queries: bool = False,
+) -> _DocInputs:
+    # Collect table refs from all queries (once per query; reused by examples.txt)
+    query_tables: dict[str, list[str]] = {q.name: _extract_table_refs(q.sql) for q in query_files}
+    all_tables = sorted({t for refs in query_tables.values() for t in refs})
+
+    # Schemas rarely change: start from the on-disk cache (if enabled and fresh)
+    on_disk: dict[str, dict[str, Any]] = {}
+    if cache_dir is not None and not refresh_schema:
+        for t in all_tables:
+            entry = _load_cached_schema(cache_dir, t, schema_ttl_seconds)
+            if entry:
+                on_disk[t] = entry
+    need_schema = [t for t in all_tables if "schema" not in on_disk.get(t, {})]
+    need_ddl = [t for t in all_tables if "ddl" not in on_disk.get(t, {})] if include_show_create else []
+
+    # Describe schemas (each call is an Athena round-trip, so run them concurrently)
+    current = {t: dict(on_disk.get(t, {})) for t in all_tables}
+    fetched: dict[str, dict[str, Any]] = {}
+    if need_schema:
+        # One catalog listing per database warms the client's schema cache, so the
+        # per-table describes below only go to Athena for tables it could not resolve.
         try:
-            schemas[t] = athena.describe_table_fq(t)
-        except Exception as e:
-            schemas[t] = [{"col_name": "__ERROR__", "data_type": str(e), "comment": ""}]
-        if include_show_create:
-            try:
-                ddl = athena.show_create_table_fq(t)
+            athena.describe_tables_bulk(need_schema)
+        except Exception:
+            pass
+    if need_schema or need_ddl:
+        with ThreadPoolExecutor(max_workers=min(16, len(need_schema) + len(need_ddl))) as executor:
+            schema_futures = [executor.submit(_describe_one, athena, t) for t in need_schema]
+            ddl_futures = [executor.submit(_ddl_one, athena, t) for t in need_ddl]
+            for future in schema_futures:
+                t, rows = future.result()
+                current[t]["schema"] = rows
+                # Errors are rendered this run but never cached.
+                if not (rows and rows[0].get("col_name") == "__ERROR__"):
+                    fetched.setdefault(t, {})["schema"] = rows
+            for future in ddl_futures:
+                t, ddl = future.result()
                 if ddl:
-                    create_ddls[t] = ddl
-            except Exception:
-                pass
+                    current[t]["ddl"] = ddl
+                    fetched.setdefault(t, {})["ddl"] = ddl
+    if cache_dir is not None:
+        for t, entry in fetched.items():
+            _save_cached_schema(cache_dir, t, {**on_disk.get(t, {}), **entry})
+
+    schemas: dict[str, list[dict[str, Any]]] = {t: current[t].get("schema", []) for t in all_tables}
+    create_ddls: dict[str, str] = {
+        t: current[t]["ddl"] for t in all_tables if include_show_create and current[t].get("ddl")
+    }
 
-    # Execute queries (capped)
+    # Reuse results of queries whose SQL (and row cap) is unchanged since the last run,
+    # as long as they were fetched within the result TTL
     executed: dict[str, QueryResult | None] = {}
     exec_errors: dict[str, str] = {}
+    hashes = {q.name: _query_hash(q.sql) for q in query_files}
+    now = time.time()
+    fetched_at: dict[str, float] = {}
+    previous = _load_manifest(cache_dir) if cache_dir is not None and not rerun_queries else {}
     for q in query_files:
-        try:
-            executed[q.name] = athena.execute_query(q.sql, max_rows=row_limit, enforce_limit=True)
-        except Exception as e:
+        prev = previous.get(q.name, {})
+        if (
+            prev.get("sha256") == hashes[q.name]
+            and prev.get("preview_rows") == preview_rows
+            and now - prev.get("fetched_at", 0) <= result_ttl_seconds
+        ):
+            cached = _load_cached_result(cache_dir, q.name)
+            if cached is not None:
+                executed[q.name] = cached
+                fetched_at[q.name] = prev["fetched_at"]
+    to_run = [q for q in query_files if q.name not in executed]
+
+    # Execute the rest, all in flight at once. Only the preview is rendered, so the query is
+    # capped (LIMIT) and fetched at preview_rows rather than pulling extra rows to discard.
+    # Sample queries are idempotent, so repeated doc builds can reuse Athena's cached results.
+    outcomes = athena.execute_queries(
+        [q.sql for q in to_run],
+        max_rows=preview_rows,
+        enforce_limit=True,
+        result_reuse_minutes=result_reuse_minutes if result_reuse_enable else None,
+    ) if to_run else []
+    for q, outcome in zip(to_run, outcomes):
+        if isinstance(outcome, Exception):
             executed[q.name] = None
-            exec_errors[q.name] = str(e)
-
-    # ---------------- catalog.txt ----------------
-    catalog_lines: list[str] = []
-    catalog_lines.append("# Data catalog (generated)")
-    catalog_lines.append("")
-    catalog_lines.append("This is generated from the SQL templates in `knowledge/queries/` by describing every referenced table.")
-    catalog_lines.append("")
-    catalog_lines.append("## Tables referenced by sample queries")
-    catalog_lines.append("")
+            exec_errors[q.name] = str(outcome)
+        else:
+            if cache_dir is not None:
+                _save_cached_result(cache_dir, q.name, outcome)
+            executed[q.name] = outcome
+            fetched_at[q.name] = now
+
+    if cache_dir is not None:
+        # Failed queries are left out so they are retried next run.
+        _save_manifest(cache_dir, {
+            q.name: {
+                "sha256": hashes[q.name],
+                "tables": query_tables[q.name],
+                "preview_rows": preview_rows,
+                "fetched_at": fetched_at[q.name],
+            }
+            for q in query_files
+            if q.name not in exec_errors
+        })
+
+    return _DocInputs(
+        query_files=query_files,
+        query_tables=query_tables,
+        all_tables=all_tables,
+        schemas=schemas,
+        create_ddls=create_ddls,
+        executed=executed,
+        exec_errors=exec_errors,
+        preview_rows=preview_rows,
+    )
+
+
+def _write_catalog(out: io.TextIOBase, docs: _DocInputs) -> None:
+    all_tables, schemas, create_ddls = docs.all_tables, docs.schemas, docs.create_ddls
+    out.write("# Data catalog (generated)\n")
+    out.write("\n")
+    out.write("This is generated from the SQL templates in `knowledge/queries/` by describing every referenced table.\n")
+    out.write("\n")
+    out.write("## Tables referenced by sample queries\n")
+    out.write("\n")
     for t in all_tables:
-        catalog_lines.append(f"### `{t}`")
-        catalog_lines.append("")
+        out.write(f"### `{t}`\n")
+        out.write("\n")
         if t in create_ddls:
-            catalog_lines.append("**DDL (SHOW CREATE TABLE)**")
-            catalog_lines.append("")
-            catalog_lines.append("```sql")
-            catalog_lines.append(create_ddls[t].rstrip())
-            catalog_lines.append("```")
-            catalog_lines.append("")
-        catalog_lines.append(_format_schema(schemas.get(t, [])))
-        catalog_lines.append("")
-
-    # ---------------- domain.txt ----------------
-    domain_lines: list[str] = []
-    domain_lines.append("# Domain knowledge (generated)")
-    domain_lines.append("")
-    domain_lines.append("Dream11 watch-along resembles Twitch-style livestreaming:")
-    domain_lines.append("- Users watch creators' streams during matches, chat, react, and participate in predictions/group goals.")
-    domain_lines.append("- Users can pay using DreamBucks (DB).")
-    domain_lines.append("- Creators upload short highlight clips (“moments”) from live streams.")
-    domain_lines.append("")
-    domain_lines.append("## Key concepts")
-    domain_lines.append("")
-    domain_lines.append("- **IST vs UTC**: Most metrics are reported in IST; queries often convert using `+ INTERVAL '330' MINUTE` or `AT TIME ZONE 'Asia/Kolkata'`.")
-    domain_lines.append("- **Sportan**: Some queries exclude SPORTAN (internal/special) users; treat SPORTAN-exclusion as an important filter when reporting public metrics.")
-    domain_lines.append("- **Grain**: Many base metrics are day-level in IST (`eventdate`, `day_ist`). Stream data may span days and must be split across days.")
-    domain_lines.append("")
-    domain_lines.append("## Table cheat sheet (from sample queries)")
-    domain_lines.append("")
+            out.write("**DDL (SHOW CREATE TABLE)**\n")
+            out.write("\n")
+            out.write("```sql\n")
+            out.write(create_ddls[t].rstrip())
+            out.write("\n")
+            out.write("```\n")
+            out.write("\n")
+        out.write(_format_schema(schemas.get(t, [])))
+        out.write("\n")
+        out.write("\n")
+
+
+def _write_domain(out: io.TextIOBase, docs: _DocInputs) -> None:
+    all_tables, schemas = docs.all_tables, docs.schemas
+    out.write("# Domain knowledge (generated)\n")
+    out.write("\n")
+    out.write("Dream11 watch-along resembles Twitch-style livestreaming:\n")
+    out.write("- Users watch creators' streams during matches, chat, react, and participate in predictions/group goals.\n")
+    out.write("- Users can pay using DreamBucks (DB).\n")
+    out.write("- Creators upload short highlight clips (“moments”) from live streams.\n")
+    out.write("\n")
+    out.write("## Key concepts\n")
+    out.write("\n")
+    out.write("- **IST vs UTC**: Most metrics are reported in IST; queries often convert using `+ INTERVAL '330' MINUTE` or `AT TIME ZONE 'Asia/Kolkata'`.\n")
+    out.write("- **Sportan**: Some queries exclude SPORTAN (internal/special) users; treat SPORTAN-exclusion as an important filter when reporting public metrics.\n")
+    out.write("- **Grain**: Many base metrics are day-level in IST (`eventdate`, `day_ist`). Stream data may span days and must be split across days.\n")
+    out.write("\n")
+    out.write("## Table cheat sheet (from sample queries)\n")
+    out.write("\n")
     for t in all_tables:
         cols = _columns_from_schema(schemas.get(t, []))
-        grain = _infer_grain(cols)
-        domain_lines.append(f"### `{t}`")
-        domain_lines.append("")
-        domain_lines.append(_table_description(t))
-        domain_lines.append("")
-        domain_lines.append(f"- **Grain (inferred)**: {grain}")
+        grain = _infer_grain({c.lower() for c, _ in cols})
+        out.write(f"### `{t}`\n")
+        out.write("\n")
+        out.write(_table_description(t))
+        out.write("\n")
+        out.write("\n")
+        out.write(f"- **Grain (inferred)**: {grain}\n")
         if cols:
-            domain_lines.append("- **Key columns**:")
+            out.write("- **Key columns**:\n")
             # show up to 12 columns; prefer time + id-like fields first
-            preferred = ["day_ist", "eventdate", "hour_bucket", "hour_of_day", "id", "userid", "customer_id", "influencerid"]
-            ordered: list[tuple[str, str]] = []
-            used: set[str] = set()
-            for p in preferred:
-                for c, tpe in cols:
-                    if c.lower() == p and c.lower() not in used:
-                        ordered.append((c, tpe))
-                        used.add(c.lower())
-            for c, tpe in cols:
-                if c.lower() in used:
-                    continue
-                ordered.append((c, tpe))
+            ordered = sorted(cols, key=lambda ct: _PREFERRED_RANK.get(ct[0].lower(), len(_PREFERRED_RANK)))
             for c, tpe in ordered[:12]:
-                domain_lines.append(f"  - `{c}` ({tpe})")
-        domain_lines.append("")
-    domain_lines.append("")
-
-    # ---------------- metrics.txt ----------------
-    metrics_lines: list[str] = []
-    metrics_lines.append("# Metrics (generated)")
-    metrics_lines.append("")
-    metrics_lines.append("This section describes the *intent* and *computation* patterns from the sample queries.")
-    metrics_lines.append("")
-    metrics_lines.append("## Engagement / activity")
-    metrics_lines.append("")
-    metrics_lines.append("- **DAU**: `d11_stitch.daylevel_metric.dau` (and related `livestream_dau`, `moment_dau`, `fantasy_dau`) aggregated by `eventdate` (IST).")
-    metrics_lines.append("- **Chats / reactions / predictions / superchats / groupgoals**: `d11_stitch.daylevel_metric.{normal_chats,reaction,prediction,superchats,groupgoal}`.")
-    metrics_lines.append("- **Engaged users / paid users**: `d11_stitch.daylevel_engagedpaid.{engaged_users,paid_users}` (joined to day by IST date in the sample query).")
-    metrics_lines.append("- **CJ users**: `d11_stitch.cjusers.users` by `eventdate` (definition of CJ should be confirmed).")
-    metrics_lines.append("")
-    metrics_lines.append("## Watch time")
-    metrics_lines.append("")
-    metrics_lines.append("- **Watch minutes (watch-along)**: sum of `watch_seconds / 60` from `d11_stitch.day_hour_watchtime`, grouped to day (see `knowledge/queries/Code.sql`).")
-    metrics_lines.append("- **Moments watchtime**: daily value from `d11_stitch.timespentonmoment.total_watch_min_cum` by taking the last `hour_bucket` per `day_ist` (see `knowledge/queries/Code.sql`).")
-    metrics_lines.append("- **Total watch minutes**: `watch_minutes_watch_along + moments_watchtime`.")
-    metrics_lines.append("")
-    metrics_lines.append("## Streaming supply")
-    metrics_lines.append("")
-    metrics_lines.append("- **Total stream minutes**: from `d11_transactions.live_streaming_stream` where `streamstatus='COMPLETED'` and start/end present; convert to IST, split streams across days, then sum seconds per day / 60 (see `Creator level strem minutes.sql`).")
-    metrics_lines.append("- **Covered hours**: per IST day, the total time where at least one stream is live (event sweep using +1 at start, -1 at end).")
-    metrics_lines.append("- **Distinct streams / creators**: `d11_stitch.daylevel_metric.{distinct_streams,distinct_creators}` (often easier than recomputing from raw).")
-    metrics_lines.append("")
-    metrics_lines.append("## DreamBucks (DB) spend/purchase")
-    metrics_lines.append("")
-    metrics_lines.append("- **Public DB spent**: from `d11_transactions.dreambucks_account_ledger` where `lower(transaction_type)='debit'`, excluding SPORTAN users via `d11_stitch.sportan_userid_new` (see `knowledge/queries/_spent.sql`).")
-    metrics_lines.append("- **Public DB purchased**: credits with `source_id = 3`, excluding meta `DreamCoins converted to DreamBucks`, excluding SPORTAN (see `knowledge/queries/_spent.sql`).")
-    metrics_lines.append("")
-    metrics_lines.append("## Common pitfalls")
-    metrics_lines.append("")
-    metrics_lines.append("- **Timezone alignment**: join on the formatted IST date consistently (many sample queries use `DATE_FORMAT(ts AT TIME ZONE 'Asia/Kolkata', '%Y-%m-%d')`).")
-    metrics_lines.append("- **Overnight streams**: never allocate full duration to start day; always split across days (sample uses `SEQUENCE(date_trunc('day', start_ist), date_trunc('day', end_ist), INTERVAL '1' DAY)`).")
-    metrics_lines.append("- **SPORTAN filtering**: replicate SPORTAN-exclusion logic when reporting public creator metrics or public user spend.")
-    metrics_lines.append("")
-
-    # ---------------- examples.txt ----------------
-    examples_lines: list[str] = []
-    examples_lines.append("# Example queries (generated)")
-    examples_lines.append("")
-    examples_lines.append("All query previews are capped to 100 rows (and 20 rows shown in this doc).")
-    examples_lines.append("")
+                out.write(f"  - `{c}` ({tpe})\n")
+        out.write("\n")
+    out.write("\n")
+
+
+def _write_metrics(out: io.TextIOBase, docs: _DocInputs) -> None:
+    out.write("# Metrics (generated)\n")
+    out.write("\n")
+    out.write("This section describes the *intent* and *computation* patterns from the sample queries.\n")
+    out.write("\n")
+    out.write("## Engagement / activity\n")
+    out.write("\n")
+    out.write("- **DAU**: `d11_stitch.daylevel_metric.dau` (and related `livestream_dau`, `moment_dau`, `fantasy_dau`) aggregated by `eventdate` (IST).\n")
+    out.write("- **Chats / reactions / predictions / superchats / groupgoals**: `d11_stitch.daylevel_metric.{normal_chats,reaction,prediction,superchats,groupgoal}`.\n")
+    out.write("- **Engaged users / paid users**: `d11_stitch.daylevel_engagedpaid.{engaged_users,paid_users}` (joined to day by IST date in the sample query).\n")
+    out.write("- **CJ users**: `d11_stitch.cjusers.users` by `eventdate` (definition of CJ should be confirmed).\n")
+    out.write("\n")
+    out.write("## Watch time\n")
+    out.write("\n")
+    out.write("- **Watch minutes (watch-along)**: sum of `watch_seconds / 60` from `d11_stitch.day_hour_watchtime`, grouped to day (see `knowledge/queries/Code.sql`).\n")
+    out.write("- **Moments watchtime**: daily value from `d11_stitch.timespentonmoment.total_watch_min_cum` by taking the last `hour_bucket` per `day_ist` (see `knowledge/queries/Code.sql`).\n")
+    out.write("- **Total watch minutes**: `watch_minutes_watch_along + moments_watchtime`.\n")
+    out.write("\n")
+    out.write("## Streaming supply\n")
+    out.write("\n")
+    out.write("- **Total stream minutes**: from `d11_transactions.live_streaming_stream` where `streamstatus='COMPLETED'` and start/end present; convert to IST, split streams across days, then sum seconds per day / 60 (see `Creator level strem minutes.sql`).\n")
+    out.write("- **Covered hours**: per IST day, the total time where at least one stream is live (event sweep using +1 at start, -1 at end).\n")
+    out.write("- **Distinct streams / creators**: `d11_stitch.daylevel_metric.{distinct_streams,distinct_creators}` (often easier than recomputing from raw).\n")
+    out.write("\n")
+    out.write("## DreamBucks (DB) spend/purchase\n")
+    out.write("\n")
+    out.write("- **Public DB spent**: from `d11_transactions.dreambucks_account_ledger` where `lower(transaction_type)='debit'`, excluding SPORTAN users via `d11_stitch.sportan_userid_new` (see `knowledge/queries/_spent.sql`).\n")
+    out.write("- **Public DB purchased**: credits with `source_id = 3`, excluding meta `DreamCoins converted to DreamBucks`, excluding SPORTAN (see `knowledge/queries/_spent.sql`).\n")
+    out.write("\n")
+    out.write("## Common pitfalls\n")
+    out.write("\n")
+    out.write("- **Timezone alignment**: join on the formatted IST date consistently (many sample queries use `DATE_FORMAT(ts AT TIME ZONE 'Asia/Kolkata', '%Y-%m-%d')`).\n")
+    out.write("- **Overnight streams**: never allocate full duration to start day; always split across days (sample uses `SEQUENCE(date_trunc('day', start_ist), date_trunc('day', end_ist), INTERVAL '1' DAY)`).\n")
+    out.write("- **SPORTAN filtering**: replicate SPORTAN-exclusion logic when reporting public creator metrics or public user spend.\n")
+    out.write("\n")
+
+
+def _write_examples(out: io.TextIOBase, docs: _DocInputs) -> None:
+    query_files, query_tables, preview_rows = docs.query_files, docs.query_tables, docs.preview_rows
+    executed, exec_errors = docs.executed, docs.exec_errors
+    out.write("# Example queries (generated)\n")
+    out.write("\n")
+    out.write(f"All query previews are capped to {preview_rows} rows.\n")
+    out.write("\n")
     for q in query_files:
-        examples_lines.append(f"## {q.name}")
-        examples_lines.append("")
-        examples_lines.append("**SQL**")
-        examples_lines.append("")
-        examples_lines.append("```sql")
-        examples_lines.append(q.sql.rstrip())
-        examples_lines.append("```")
-        examples_lines.append("")
-        refs = _extract_table_refs(q.sql)
+        out.write(f"## {q.name}\n")
+        out.write("\n")
+        out.write("**SQL**\n")
+        out.write("\n")
+        out.write("```sql\n")
+        out.write(q.sql.rstrip())
+        out.write("\n")
+        out.write("```\n")
+        out.write("\n")
+        refs = query_tables[q.name]
         if refs:
-            examples_lines.append("**Tables referenced**")
-            examples_lines.append("")
+            out.write("**Tables referenced**\n")
+            out.write("\n")
             for t in refs:
-                examples_lines.append(f"- `{t}`")
-            examples_lines.append("")
+                out.write(f"- `{t}`\n")
+            out.write("\n")
         if q.name in exec_errors:
-            examples_lines.append("**Execution error**")
-            examples_lines.append("")
-            examples_lines.append(f"`{exec_errors[q.name]}`")
-            examples_lines.append("")
+            out.write("**Execution error**\n")
+            out.write("\n")
+            out.write(f"`{exec_errors[q.name]}`\n")
+            out.write("\n")
         else:
             res = executed.get(q.name)
             if res is not None:
-                examples_lines.append("**Result preview**")
-                examples_lines.append("")
-                examples_lines.append(_format_query_result_preview(res, max_rows=preview_rows))
-                examples_lines.append("")
-
-    return {
-        "catalog.txt": "\n".join(catalog_lines).rstrip() + "\n",
-        "domain.txt": "\n".join(domain_lines).rstrip() + "\n",
-        "metrics.txt": "\n".join(metrics_lines).rstrip() + "\n",
-        "examples.txt": "\n".join(examples_lines).rstrip() + "\n",
-    }
+                out.write("**Result preview**\n")
+                out.write("\n")
+                out.write(_format_query_result_preview(res, max_rows=preview_rows))
+                out.write("\n")
+                out.write("\n")
+
+
+DocWriter = Callable[[io.TextIOBase, _DocInputs], None]
+
+_DOC_WRITERS: dict[str, DocWriter] = {
+    "catalog.txt": _write_catalog,
+    "domain.txt": _write_domain,
+    "metrics.txt": _write_metrics,
+    "examples.txt": _write_examples,
+}
+
+
+def _render(writer: DocWriter, docs: _DocInputs, out: io.TextIOBase) -> None:
+    trimmed = _RStripWriter(out)
+    writer(trimmed, docs)
+    trimmed.finish()
+
+
+def generate_docs(
+    *,
+    athena: AthenaClient,
+    query_files: list[QueryFile],
+    preview_rows: int,
+    include_show_create: bool,
+    result_reuse_enable: bool = True,
+    result_reuse_minutes: int = 60,
+    cache_dir: Path | None = None,
+    schema_ttl_seconds: float = SCHEMA_CACHE_TTL_SECONDS,
+    result_ttl_seconds: float = RESULT_CACHE_TTL_SECONDS,
+    refresh_schema: bool = False,
+    rerun_queries: bool = False,
+    row_limit: int | None = None,
+) -> dict[str, str]:
+    """
+    Build all docs in memory and return them keyed by file name.
+    `row_limit` is accepted for older callers but ignored: queries fetch `preview_rows` rows.
+    """
+    docs = _prepare_docs(
+        athena=athena,
+        query_files=query_files,
+        preview_rows=preview_rows,
+        include_show_create=include_show_create,
+        result_reuse_enable=result_reuse_enable,
+        result_reuse_minutes=result_reuse_minutes,
+        cache_dir=cache_dir,
+        schema_ttl_seconds=schema_ttl_seconds,
+        result_ttl_seconds=result_ttl_seconds,
+        refresh_schema=refresh_schema,
+        rerun_queries=rerun_queries,
+    )
+
+    def render_to_string(writer: DocWriter) -> str:
+        buf = io.StringIO()
+        _render(writer, docs, buf)
+        return buf.getvalue()
+
+    # The writers are independent once the inputs are gathered.
+    with ThreadPoolExecutor(max_workers=len(_DOC_WRITERS)) as executor:
+        rendered = executor.map(render_to_string, _DOC_WRITERS.values())
+        return dict(zip(_DOC_WRITERS, rendered))
+
+
+def _write_doc_file(out_dir: Path, filename: str, writer: DocWriter, docs: _DocInputs) -> Path | None:
+    """Stream one doc to a temp file; move it into place only if it differs. Returns the path if changed."""
+    path = out_dir / filename
+    tmp_path = path.with_name(f".{filename}.tmp")
+    with open(tmp_path, "w", encoding="utf-8", buffering=1 << 20) as f:
+        _render(writer, docs, f)
+    if path.is_file() and filecmp.cmp(tmp_path, path, shallow=False):
+        tmp_path.unlink()
+        return None
+    os.replace(tmp_path, path)
+    return path
+
+
+def generate_docs_to(
+    out_dir: Path,
+    *,
+    athena: AthenaClient,
+    query_files: list[QueryFile],
+    preview_rows: int,
+    include_show_create: bool,
+    result_reuse_enable: bool = True,
+    result_reuse_minutes: int = 60,
+    cache_dir: Path | None = None,
+    schema_ttl_seconds: float = SCHEMA_CACHE_TTL_SECONDS,
+    result_ttl_seconds: float = RESULT_CACHE_TTL_SECONDS,
+    refresh_schema: bool = False,
+    rerun_queries: bool = False,
+    row_limit: int | None = None,
+) -> list[Path]:
+    """
+    Build all docs, streaming each one into a temp file under `out_dir` (one thread per doc).
+    A doc replaces its existing file only if the content differs, so unchanged docs keep
+    their mtime (and don't trigger downstream reloads). Returns the paths that changed.
+    `row_limit` is accepted for older callers but ignored, like the --row-limit flag.
+    """
+    docs = _prepare_docs(
+        athena=athena,
+        query_files=query_files,
+        preview_rows=preview_rows,
+        include_show_create=include_show_create,
+        result_reuse_enable=result_reuse_enable,
+        result_reuse_minutes=result_reuse_minutes,
+        cache_dir=cache_dir,
+        schema_ttl_seconds=schema_ttl_seconds,
+        result_ttl_seconds=result_ttl_seconds,
+        refresh_schema=refresh_schema,
+        rerun_queries=rerun_queries,
+    )
+    out_dir.mkdir(parents=True, exist_ok=True)
+    with ThreadPoolExecutor(max_workers=len(_DOC_WRITERS)) as executor:
+        futures = [
+            executor.submit(_write_doc_file, out_dir, filename, writer, docs)
+            for filename, writer in _DOC_WRITERS.items()
+        ]
+        return [path for path in (f.result() for f in futures) if path is not None]
 
 
 def main() -> None:
     parser = argparse.ArgumentParser(description="Generate knowledge docs from sample Athena queries.")
-    parser.add_argument("--row-limit", type=int, default=100, help="Hard cap on rows fetched per query.")
-    parser.add_argument("--preview-rows", type=int, default=20, help="Rows shown per query in examples.txt.")
+    # Previews fetch only --preview-rows rows; --row-limit is accepted for older scripts but unused.
+    parser.add_argument("--row-limit", type=int, default=100, help=argparse.SUPPRESS)
+    parser.add_argument("--preview-rows", type=int, default=20, help="Rows fetched and shown per query in examples.txt.")
     parser.add_argument("--include-show-create", action="store_true", help="Include SHOW CREATE TABLE DDL in catalog.")
+    parser.add_argument("--no-result-reuse", action="store_true", help="Always re-run sample queries instead of reusing recent Athena results.")
+    parser.add_argument("--result-reuse-minutes", type=int, default=60, help="Max age of reusable Athena query results.")
+    parser.add_argument("--refresh-schema", action="store_true", help="Ignore cached table schemas/DDL and refetch them.")
+    parser.add_argument("--rerun-queries", action="store_true", help="Re-run every sample query even if its SQL is unchanged.")
+    parser.add_argument(
+        "--fetch-mode",
+        choices=["api", "s3", "auto"],
+        default="auto",
+        help="Read previews via GetQueryResults ('api') or a ranged read of the result CSV on S3 ('s3', needs pyarrow). "
+        "'auto' (default) picks 's3' when pyarrow is installed.",
+    )
     parser.add_argument("--workgroup", default="data_stitch")
     parser.add_argument("--database", default="d11_stitch")
     parser.add_argument("--region", default="us-east-1")
@@ -364,21 +722,24 @@ def main() -> None:
     if not query_files:
         raise SystemExit(f"No .sql files found in {qdir}")
 
-    athena = AthenaClient(workgroup=args.workgroup, database=args.database, region=args.region)
-    docs = generate_docs(
+    athena = AthenaClient(
+        workgroup=args.workgroup, database=args.database, region=args.region, fetch_mode=args.fetch_mode
+    )
+    out_dir = _knowledge_dir()
+    changed = generate_docs_to(
+        out_dir,
         athena=athena,
         query_files=query_files,
-        row_limit=max(1, min(args.row_limit, 100)),
         preview_rows=max(1, min(args.preview_rows, 50)),
         include_show_create=bool(args.include_show_create),
+        result_reuse_enable=not args.no_result_reuse,
+        result_reuse_minutes=max(1, args.result_reuse_minutes),
+        cache_dir=out_dir / ".cache",
+        refresh_schema=bool(args.refresh_schema),
+        rerun_queries=bool(args.rerun_queries),
     )
 
-    out_dir = _knowledge_dir()
-    out_dir.mkdir(parents=True, exist_ok=True)
-    for filename, content in docs.items():
-        (out_dir / filename).write_text(content, encoding="utf-8")
-
-    print(f"Wrote {len(docs)} files to {out_dir}")
+    print(f"Wrote {len(changed)} changed files to {out_dir} ({len(_DOC_WRITERS) - len(changed)} unchanged)")
 
 
 if __name__ == "__main__":
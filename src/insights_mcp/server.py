@@ -4,7 +4,17 @@ Insights MCP Server - Analytics MCP server for d11_stitch data warehouse.
 Provides tools for querying Athena, exploring schemas, and analytics prompts.
 """
 
+import hashlib
+import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime
+from functools import lru_cache
+from itertools import islice
 from pathlib import Path
+from typing import Callable
 
 from fastmcp import FastMCP
 
@@ -31,42 +41,103 @@ Always check the knowledge resources before writing queries.
 Start by understanding what tables are available and their structure.""",
 )
 
-# Initialize Athena client
-athena = AthenaClient()
+# Initialize Athena client. Results are paged through GetQueryResults; the S3 CSV
+# reader (fetch_mode="s3"/"auto") is opt-in.
+athena = AthenaClient(fetch_mode="api")
 
 
 # ============== HELPER FUNCTIONS ==============
 
+# Formatted tool responses, so a repeated tool call within a session skips Athena.
+_RESPONSE_CACHE_TTL_SECONDS = 300.0
+_RESPONSE_CACHE_MAX_ENTRIES = 128
+_response_cache: OrderedDict[tuple, tuple[float, str]] = OrderedDict()
+# Responses being computed right now; a concurrent identical call waits on the first
+# one's Future instead of running the same query again.
+_response_inflight: dict[tuple, Future[str]] = {}
+_response_cache_lock = threading.Lock()
+
+
+def _cached_response(key: tuple, compute: Callable[[], str], ttl: float = _RESPONSE_CACHE_TTL_SECONDS) -> str:
+    """Return the response cached for `key` if younger than `ttl`, else compute and cache it.
+    Concurrent misses for the same key share one `compute` call, so `compute` must be
+    read-only: callers route statements with side effects around this function.
+    Exceptions from `compute` propagate (to every waiter) and are not cached."""
+    with _response_cache_lock:
+        hit = _response_cache.get(key)
+        if hit is not None and time.monotonic() - hit[0] < ttl:
+            _response_cache.move_to_end(key)
+            return hit[1]
+        pending = _response_inflight.get(key)
+        if pending is None:
+            future: Future[str] = Future()
+            _response_inflight[key] = future
+    if pending is not None:
+        return pending.result()
 
-def format_query_result(result: QueryResult, max_rows: int = 50) -> str:
-    """Format query result as a readable string."""
+    try:
+        value = compute()
+    except BaseException as e:
+        with _response_cache_lock:
+            del _response_inflight[key]
+        future.set_exception(e)
+        raise
+    with _response_cache_lock:
+        del _response_inflight[key]
+        _response_cache[key] = (time.monotonic(), value)
+        _response_cache.move_to_end(key)
+        while len(_response_cache) > _RESPONSE_CACHE_MAX_ENTRIES:
+            _response_cache.popitem(last=False)
+    future.set_result(value)
+    return value
+
+
+def format_query_result(result: QueryResult, max_rows: int = 50, row_cap: int | None = None) -> str:
+    """
+    Format query result as a readable string.
+    `row_cap` is the limit the rows were fetched with; reaching it is called out, since
+    Athena stops paginating there and the full result may be larger.
+    """
     lines = []
 
     # Header
     lines.append(f"Query ID: {result.query_execution_id}")
     lines.append(f"Columns: {', '.join(result.columns)}")
-    lines.append(f"Total rows: {len(result.rows)}")
+    if row_cap is not None and len(result.rows) >= row_cap:
+        lines.append(f"Total rows: {len(result.rows)} (row cap reached; more rows may exist)")
+    else:
+        lines.append(f"Total rows: {len(result.rows)}")
 
     if result.statistics:
-        data_scanned = result.statistics.get("DataScannedInBytes", 0)
-        exec_time = result.statistics.get("TotalExecutionTimeInMillis", 0)
-        lines.append(f"Data scanned: {data_scanned / 1024 / 1024:.2f} MB")
-        lines.append(f"Execution time: {exec_time / 1000:.2f}s")
+        # Cached/reused results and DDL report no scan or time; skip lines that would say 0.
+        data_scanned = result.statistics.get("DataScannedInBytes") or 0
+        exec_time = result.statistics.get("TotalExecutionTimeInMillis") or 0
+        if data_scanned:
+            lines.append(f"Data scanned: {data_scanned / 1048576:.2f} MB")
+        if exec_time:
+            lines.append(f"Execution time: {exec_time / 1000:.2f}s")
 
     lines.append("")
 
     # Data as markdown table
     if result.rows:
-        display_rows = result.rows[:max_rows]
+        columns = result.columns
+        nulls = ["NULL"] * len(columns)
 
-        # Header row
-        lines.append("| " + " | ".join(result.columns) + " |")
-        lines.append("| " + " | ".join(["---"] * len(result.columns)) + " |")
+        join = " | ".join
 
-        # Data rows
-        for row in display_rows:
-            values = [str(row.get(col, "NULL"))[:50] for col in result.columns]
-            lines.append("| " + " | ".join(values) + " |")
+        # Header row
+        lines.append(f"| {join(columns)} |")
+        lines.append(f"| {join(['---'] * len(columns))} |")
+
+        # Data rows: column order is fixed, and map() drives row.get from C. Most cells
+        # are already str (CSV/API results), so str() is only called for other types.
+        for row in islice(result.rows, max_rows):
+            cells = [
+                (v if type(v) is str else "NULL" if v is None else str(v))[:50]
+                for v in map(row.get, columns, nulls)
+            ]
+            lines.append(f"| {join(cells)} |")
 
         if len(result.rows) > max_rows:
             lines.append(f"\n... and {len(result.rows) - max_rows} more rows")
@@ -74,17 +145,39 @@ def format_query_result(result: QueryResult, max_rows: int = 50) -> str:
     return "\n".join(lines)
 
 
+def format_table_schema(database: str, table: str, schema: list[dict]) -> str:
+    """Format DESCRIBE-style rows as a markdown column table."""
+    header = [f"Schema for {database}.{table}:", "", "| Column | Type |", "| --- | --- |"]
+    # Skip blank separator rows and "# Partition Information" rows
+    body = [
+        f"| {col_name} | {row.get('data_type', '')} |"
+        for row in schema
+        if (col_name := row.get("col_name", "")) and not col_name.startswith("#")
+    ]
+    return "\n".join(header + body)
+
+
+def _list_tables_response(database: str) -> str:
+    def compute() -> str:
+        tables = athena.list_tables(database)
+        return f"Tables in {database}:\n" + "\n".join(f"  - {t}" for t in tables)
+
+    return _cached_response(("list_tables", database.strip().lower()), compute)
+
+
 # ============== TOOLS ==============
 
 
 @mcp.tool()
-def run_query(query: str, max_rows: int = 100) -> str:
+def run_query(query: str, max_rows: int = 100, max_age_minutes: int = 60) -> str:
     """
     Execute a SQL query against the d11_stitch database.
 
     Args:
         query: SQL query to execute. Use standard Presto/Trino SQL syntax.
         max_rows: Maximum number of rows to return in the response (default: 100)
+        max_age_minutes: Reuse results of an identical query run within this many
+            minutes instead of scanning the data again (default: 60, 0 disables)
 
     Returns:
         Formatted query results with columns, data, and execution statistics.
@@ -94,8 +187,27 @@ def run_query(query: str, max_rows: int = 100) -> str:
     """
     try:
         max_rows = min(int(max_rows), 100)
-        result = athena.execute_query(query, max_rows=max_rows, enforce_limit=True)
-        return format_query_result(result, max_rows=max_rows)
+        max_age_minutes = max(0, int(max_age_minutes))
+
+        def compute() -> str:
+            result = athena.execute_query(
+                query,
+                max_rows=max_rows,
+                enforce_limit=True,
+                result_reuse_minutes=max_age_minutes or None,
+            )
+            return format_query_result(result, max_rows=max_rows, row_cap=max_rows)
+
+        # Writes (INSERT, CTAS, DROP, ...) must run once per call: never served from the
+        # cache, and never merged with a concurrent identical call by _cached_response.
+        if not max_age_minutes or not athena.is_read_only(query):
+            return compute()
+        digest = hashlib.blake2b(athena.normalize_query(query).encode("utf-8")).hexdigest()
+        return _cached_response(
+            ("run_query", digest, max_rows),
+            compute,
+            ttl=min(_RESPONSE_CACHE_TTL_SECONDS, max_age_minutes * 60.0),
+        )
     except Exception as e:
         return f"Query failed: {str(e)}"
 
@@ -112,8 +224,7 @@ def list_tables(database: str = "d11_stitch") -> str:
         List of table names in the database.
     """
     try:
-        tables = athena.list_tables(database)
-        return f"Tables in {database}:\n" + "\n".join(f"  - {t}" for t in tables)
+        return _list_tables_response(database)
     except Exception as e:
         return f"Failed to list tables: {str(e)}"
 
@@ -131,21 +242,54 @@ def describe_table(table: str, database: str = "d11_stitch") -> str:
         Table schema with column names and data types.
     """
     try:
-        schema = athena.describe_table(table, database)
-        lines = [f"Schema for {database}.{table}:", ""]
-        lines.append("| Column | Type |")
-        lines.append("| --- | --- |")
-        for row in schema:
-            col_name = row.get("col_name", "")
-            data_type = row.get("data_type", "")
-            # Skip partition info rows
-            if col_name and not col_name.startswith("#"):
-                lines.append(f"| {col_name} | {data_type} |")
-        return "\n".join(lines)
+        return _cached_response(
+            ("describe_table", database, table),
+            lambda: format_table_schema(database, table, athena.describe_table(table, database)),
+        )
     except Exception as e:
         return f"Failed to describe table: {str(e)}"
 
 
+@mcp.tool()
+def describe_tables(tables: list[str], database: str = "d11_stitch") -> str:
+    """
+    Get the schemas for several tables at once.
+
+    Prefer this over repeated describe_table calls: the schemas are fetched together
+    (one catalog listing) instead of one round-trip per table.
+
+    Args:
+        tables: Table names to describe
+        database: Database name (default: d11_stitch)
+
+    Returns:
+        One schema section per table, in the order given.
+    """
+    try:
+        names = list(dict.fromkeys(t.strip() for t in tables if t.strip()))
+        prefetched = athena.describe_tables_bulk([f"{database}.{t}" for t in names])
+
+        def describe(table: str) -> str:
+            schema = prefetched.get(f"{database}.{table}")
+            try:
+                return _cached_response(
+                    ("describe_table", database, table),
+                    lambda: format_table_schema(
+                        database,
+                        table,
+                        schema if schema is not None else athena.describe_table(table, database),
+                    ),
+                )
+            except Exception as e:
+                return f"Failed to describe {database}.{table}: {str(e)}"
+
+        # Tables the bulk listing missed fall back to per-table lookups, run concurrently.
+        with ThreadPoolExecutor(max_workers=max(1, min(8, len(names)))) as executor:
+            return "\n\n".join(executor.map(describe, names))
+    except Exception as e:
+        return f"Failed to describe tables: {str(e)}"
+
+
 @mcp.tool()
 def get_sample_data(table: str, limit: int = 5, database: str = "d11_stitch") -> str:
     """
@@ -161,28 +305,49 @@ def get_sample_data(table: str, limit: int = 5, database: str = "d11_stitch") ->
     """
     limit = min(limit, 20)  # Cap at 20 rows for samples
     try:
-        result = athena.get_sample_data(table, limit, database)
-        return format_query_result(result, max_rows=limit)
+        def compute() -> str:
+            result = athena.get_sample_data(table, limit, database)
+            return format_query_result(result, max_rows=limit)
+
+        return _cached_response(("get_sample_data", database, table, limit), compute)
     except Exception as e:
         return f"Failed to get sample data: {str(e)}"
 
 
 # ============== RESOURCES ==============
 
+@lru_cache(maxsize=1)
 def _get_knowledge_path() -> Path:
-    """Get the path to the knowledge directory."""
+    """Get the path to the knowledge directory (resolved once; `resolve()` stats the filesystem)."""
     repo_root = Path(__file__).resolve().parents[2]
     return repo_root / "knowledge"
 
 
+@lru_cache(maxsize=64)
+def _read_knowledge_file_cached(filepath: Path, mtime_ns: int) -> str:
+    # Decoded once per file version; every later request is served the same str.
+    return filepath.read_text(encoding="utf-8")
+
+
 def _read_knowledge_file(filepath: Path) -> str:
-    """Read a knowledge file and return its content."""
+    """Read a knowledge file and return its content (cached until the file changes)."""
     try:
-        return filepath.read_text(encoding="utf-8")
+        # One stat per request keeps docs fresh after knowledge_gen rewrites them.
+        return _read_knowledge_file_cached(filepath, filepath.stat().st_mtime_ns)
     except Exception as e:
         return f"Error reading file: {str(e)}"
 
 
+def _warm_knowledge_cache() -> None:
+    """Read the files served as resources once, so the first requests are cache hits."""
+    knowledge = _get_knowledge_path()
+    paths = [knowledge / name for name in ("catalog.txt", "domain.txt", "metrics.txt", "examples.txt")]
+    paths += [knowledge / "queries" / filename for _, filename, _, _ in QUERY_RESOURCES]
+    # Reads release the GIL, so issuing them together overlaps the file I/O.
+    with ThreadPoolExecutor(max_workers=min(8, len(paths))) as executor:
+        list(executor.map(_read_knowledge_file, paths))
+
+
 @mcp.resource("insights://knowledge/catalog")
 def get_catalog() -> str:
     """
@@ -223,42 +388,47 @@ def get_examples() -> str:
     return _read_knowledge_file(path)
 
 
-@mcp.resource("insights://knowledge/queries/spent")
-def get_query_spent() -> str:
-    """SQL query: Time spent analysis."""
-    path = _get_knowledge_path() / "queries" / "_spent.sql"
-    return _read_knowledge_file(path)
+# (URI slug, file under knowledge/queries/, resource name, description)
+QUERY_RESOURCES = [
+    ("spent", "_spent.sql", "get_query_spent", "SQL query: Time spent analysis."),
+    (
+        "chats-predictions-reactions-superchats",
+        "Chats, Predictions, reactions, superchats.sql",
+        "get_query_chats_etc",
+        "SQL query: Chats, Predictions, reactions, and superchats analysis.",
+    ),
+    ("code", "Code.sql", "get_query_code", "SQL query: Code-related analysis."),
+    (
+        "creator-level-stream-minutes",
+        "Creator level strem minutes.sql",
+        "get_query_creator_stream_minutes",
+        "SQL query: Creator level stream minutes analysis.",
+    ),
+    (
+        "day-level-creators-streams-moments",
+        "Day level creatos, active streams, moments uploaded..sql",
+        "get_query_day_level",
+        "SQL query: Day level creators, active streams, and moments uploaded.",
+    ),
+]
 
 
-@mcp.resource("insights://knowledge/queries/chats-predictions-reactions-superchats")
-def get_query_chats_etc() -> str:
-    """SQL query: Chats, Predictions, reactions, and superchats analysis."""
-    path = _get_knowledge_path() / "queries" / "Chats, Predictions, reactions, superchats.sql"
-    return _read_knowledge_file(path)
+def _register_query_resource(slug: str, filename: str, name: str, description: str) -> None:
+    def read_query() -> str:
+        return _read_knowledge_file(_get_knowledge_path() / "queries" / filename)
 
+    mcp.resource(f"insights://knowledge/queries/{slug}", name=name, description=description)(read_query)
 
-@mcp.resource("insights://knowledge/queries/code")
-def get_query_code() -> str:
-    """SQL query: Code-related analysis."""
-    path = _get_knowledge_path() / "queries" / "Code.sql"
-    return _read_knowledge_file(path)
 
-
-@mcp.resource("insights://knowledge/queries/creator-level-stream-minutes")
-def get_query_creator_stream_minutes() -> str:
-    """SQL query: Creator level stream minutes analysis."""
-    path = _get_knowledge_path() / "queries" / "Creator level strem minutes.sql"
-    return _read_knowledge_file(path)
+for _query_resource in QUERY_RESOURCES:
+    _register_query_resource(*_query_resource)
 
 
-@mcp.resource("insights://knowledge/queries/day-level-creators-streams-moments")
-def get_query_day_level() -> str:
-    """SQL query: Day level creators, active streams, and moments uploaded."""
-    path = _get_knowledge_path() / "queries" / "Day level creatos, active streams, moments uploaded..sql"
-    return _read_knowledge_file(path)
+# ============== PROMPTS ==============
 
+# Suffix for the report/feedback file names the prompts ask the model to create.
+_TIMESTAMP_FORMAT = "%Y%m%d_%H%M%S"
 
-# ============== PROMPTS ==============
 
 @mcp.prompt()
 def answer_question() -> str:
@@ -294,8 +464,7 @@ def generate_feedback() -> str:
     Args:
         question_answered: The question or task that was just completed
     """
-    from datetime import datetime
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    timestamp = datetime.now().strftime(_TIMESTAMP_FORMAT)
     
     return f"""You just completed answering a question.
 
@@ -358,8 +527,8 @@ def create_comprehensive_report() -> str:
     This prompt guides the creation of a detailed report documenting the entire
     conversation, results, and queries used.
     """
-    from datetime import datetime
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    now = datetime.now()
+    timestamp = now.strftime(_TIMESTAMP_FORMAT)
     
     return f"""Create a comprehensive markdown report documenting this discussion and analysis.
 
@@ -480,7 +649,7 @@ List the knowledge base resources consulted:
 
 ---
 
-**Report Generated**: {datetime.now().strftime("%B %d, %Y at %H:%M:%S")}
+**Report Generated**: {now.strftime("%B %d, %Y at %H:%M:%S")}
 
 Make the report professional, well-formatted, and easy to read. Use appropriate markdown formatting including headers, tables, code blocks, and lists."""
 
@@ -493,8 +662,7 @@ def submit_feedback() -> str:
     This prompt guides an interactive feedback collection process and prepares
     a feedback submission (GitHub integration to be added).
     """
-    from datetime import datetime
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    timestamp = datetime.now().strftime(_TIMESTAMP_FORMAT)
     
     return f"""Let's collect your feedback about this analysis session.
 
@@ -579,9 +747,29 @@ Please provide your responses to the questions above, and I'll format them into
 # ============== MAIN ==============
 
 
+def _warm_up() -> None:
+    """
+    Pay cold-start costs before the first tool call: credential resolution, the
+    Athena (and S3 result) connections, and the table list (left in the response
+    cache). Knowledge files are pre-read separately by `_warm_knowledge_cache`.
+    """
+    start = time.monotonic()
+    try:
+        athena.warm_up()
+        _list_tables_response(athena.database)
+    except Exception as e:
+        print(f"Warmup incomplete: {str(e)}", file=sys.stderr)
+        return
+    print(f"Warmup finished in {time.monotonic() - start:.2f}s", file=sys.stderr)
+
+
 def main():
     """Run the MCP server."""
     print("Starting InsightsMCP server...")
+    # Warm up in the background so the server starts accepting requests immediately.
+    # This happens here rather than at import, so the CLIs that import the package don't pay for it.
+    threading.Thread(target=_warm_knowledge_cache, name="insights-knowledge-warmup", daemon=True).start()
+    threading.Thread(target=_warm_up, name="insights-warmup", daemon=True).start()
     mcp.run()
 
 
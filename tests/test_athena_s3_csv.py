@@ -0,0 +1,56 @@
+"""Parsing of Athena result CSVs read from S3 (fetch_mode="s3")."""
+
+import io
+
+import pytest
+
+pytest.importorskip("pyarrow")
+
+from insights_mcp import athena as athena_module
+from insights_mcp.athena import AthenaClient
+
+
+class _FakeS3:
+    def __init__(self, data: bytes):
+        self.data = data
+
+    def get_object(self, Bucket, Key, Range):
+        start, end = map(int, Range.removeprefix("bytes=").split("-"))
+        return {"Body": io.BytesIO(self.data[start:end + 1])}
+
+    def download_fileobj(self, bucket, key, fileobj):
+        fileobj.write(self.data)
+
+
+def _athena_csv(columns, rows) -> bytes:
+    def quote(value):
+        return "" if value is None else '"' + value.replace('"', '""') + '"'
+
+    lines = [",".join(quote(c) for c in columns)]
+    lines += [",".join(quote(v) for v in row) for row in rows]
+    return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+@pytest.fixture
+def client_for(monkeypatch):
+    def make(data: bytes) -> AthenaClient:
+        s3 = _FakeS3(data)
+        monkeypatch.setattr(athena_module, "_make_client", lambda service, region: s3)
+        return AthenaClient(fetch_mode="s3")
+
+    return make
+
+
+def test_multiline_values_in_result_over_block_size(client_for):
+    columns = ["id", "note", "tag"]
+    rows = [(str(i), f"line one {i}\nline two, \"quoted\"\nline three", None if i % 7 else "x") for i in range(40_000)]
+    data = _athena_csv(columns, rows)
+    assert len(data) > 1 << 20  # larger than pyarrow's default CSV block size
+
+    got = [row for _, page in client_for(data)._iter_s3_csv_pages("s3://bucket/q.csv") for row in page]
+
+    assert got == [dict(zip(columns, row)) for row in rows]
+
+
+def test_empty_result_object_yields_no_rows(client_for):
+    assert list(client_for(b"")._iter_s3_csv_pages("s3://bucket/q.csv")) == [([], [])]